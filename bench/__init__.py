@@ -0,0 +1 @@
+# Offline benchmarks for the search path. Run with `python -m bench --help`.
@@ -0,0 +1,188 @@
+import argparse
+import json
+import os
+import random
+import string
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .stubs import BooksStub, ChatStub
+
+PERCENTILES = (50, 95, 99)
+MIN_P95_DELTA_MS = 1.0
+SCENARIOS = (
+    "books_cold", "books_warm", "agent_cold", "agent_warm", "search_cold", "search_warm", "first_result",
+)
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(latencies, elapsed, errors):
+    summary = {f"p{pct}_ms": round(percentile(latencies, pct), 3) for pct in PERCENTILES}
+    summary.update({
+        "requests": len(latencies),
+        "errors": errors,
+        "qps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+    })
+    return summary
+
+
+def drive(fn, inputs, concurrency):
+    latencies, errors = [], 0
+
+    def timed(value):
+        start = time.perf_counter()
+        try:
+            fn(value)
+            failed = False
+        except Exception:
+            failed = True
+        return (time.perf_counter() - start) * 1000, failed
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for ms, failed in pool.map(timed, inputs):
+            latencies.append(ms)
+            errors += failed
+    return summarize(latencies, time.perf_counter() - start, errors)
+
+
+def random_prompts(count, seed):
+    # Random words so neither the rule-based extractor nor the fuzzy memo can answer them
+    rng = random.Random(seed)
+    word = lambda: "".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 9)))
+    return [" ".join(word() for _ in range(4)) for _ in range(count)]
+
+
+def configure_environment(books, chat, cache_dir):
+    # Must run before universal_pages is imported: its config is read at import time.
+    # Explicit environment overrides win so a run can be pinned to production settings.
+    defaults = {
+        "GOOGLE_BOOKS_URL": books.volumes_url,
+        "GROQ_BASE_URL": chat.url,
+        "GROQ_API_KEY": "bench",
+        "CACHE_DIR": cache_dir,
+        "ASSET_SERVER_ENABLED": "0",
+        "INTENT_CACHE_THRESHOLD": "100",
+        "BOOKS_RATE_LIMIT": "100000",
+        "BOOKS_BURST": "100000",
+        "BOOKS_MAX_CONCURRENCY": "256",
+        "GROQ_RATE_LIMIT": "100000",
+        "GROQ_BURST": "100000",
+        "GROQ_MAX_CONCURRENCY": "256",
+        "LLM_BUDGET": "30",
+    }
+    for name, value in defaults.items():
+        os.environ.setdefault(name, value)
+
+
+def run(args):
+    books_stub = BooksStub(args.books_latency, args.jitter, args.error_rate, seed=1).start()
+    chat_stub = ChatStub(args.llm_latency, args.jitter, args.error_rate, seed=2).start()
+    cache_dir = tempfile.mkdtemp(prefix="bench-cache-")
+    configure_environment(books_stub, chat_stub, cache_dir)
+
+    from universal_pages.books_api import get_multiple_books
+    from universal_pages.camel_agent import get_agent
+    from universal_pages.search import run_search, stream_search
+
+    agent = get_agent()
+    n = args.requests
+    # Disjoint random words, so every cold query has to reach the Google Books stub
+    books_queries = random_prompts(n, seed=6)
+    prompts = random_prompts(n, seed=3)
+    search_queries = random_prompts(n, seed=4)
+    search = lambda query: run_search(query, agent.ask, get_multiple_books)
+    first_result_queries = random_prompts(n, seed=5)
+
+    def first_result(query):
+        # Time until the cards can be drawn; the intent keeps streaming in the background
+        for kind, _ in stream_search(query, agent.ask, get_multiple_books):
+            if kind == "books":
+                return
+
+    plan = {
+        "books_cold": (get_multiple_books, books_queries),
+        "books_warm": (get_multiple_books, books_queries),
+        "agent_cold": (agent.ask, prompts),
+        "agent_warm": (agent.ask, prompts),
+        "search_cold": (search, search_queries),
+        "search_warm": (search, search_queries),
+        "first_result": (first_result, first_result_queries),
+    }
+    results = {}
+    for name in args.scenarios:
+        fn, inputs = plan[name]
+        results[name] = drive(fn, inputs, args.concurrency)
+        print(f"{name:12s} " + "  ".join(f"{k}={v}" for k, v in results[name].items()), file=sys.stderr)
+
+    books_stub.stop()
+    chat_stub.stop()
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "settings": {
+            "requests": n,
+            "concurrency": args.concurrency,
+            "books_latency_ms": args.books_latency,
+            "llm_latency_ms": args.llm_latency,
+            "jitter_ms": args.jitter,
+            "error_rate": args.error_rate,
+        },
+        "upstream_requests": {"books": books_stub.requests, "llm": chat_stub.requests},
+        "scenarios": results,
+    }
+
+
+def compare(results, baseline, tolerance):
+    # Flags scenarios whose p95 grew or throughput shrank by more than `tolerance` (a fraction).
+    # Sub-millisecond p95 shifts are scheduler noise on cache hits and never count.
+    regressions = []
+    for name, current in results["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if not previous:
+            continue
+        p95_change = (current["p95_ms"] - previous["p95_ms"]) / max(previous["p95_ms"], 1e-9)
+        qps_change = (current["qps"] - previous["qps"]) / max(previous["qps"], 1e-9)
+        slower = p95_change > tolerance and current["p95_ms"] - previous["p95_ms"] > MIN_P95_DELTA_MS
+        flag = slower or qps_change < -tolerance
+        print(f"{name:12s} p95 {p95_change:+.1%}  qps {qps_change:+.1%}{'  REGRESSION' if flag else ''}",
+              file=sys.stderr)
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench", description="Offline search benchmarks against local stubs.")
+    parser.add_argument("-n", "--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("-c", "--concurrency", type=int, default=16)
+    parser.add_argument("--books-latency", type=float, default=120.0, help="stub Google Books latency (ms)")
+    parser.add_argument("--llm-latency", type=float, default=400.0, help="stub chat-completions latency (ms)")
+    parser.add_argument("--jitter", type=float, default=20.0, help="latency standard deviation (ms)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of stub requests that fail")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("-o", "--output", default=os.path.join("bench", "results", "latest.json"))
+    parser.add_argument("--baseline", help="earlier results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed regression before failing")
+    args = parser.parse_args(argv)
+
+    results = run(args)
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as output:
+        json.dump(results, output, indent=2)
+    print(f"results written to {args.output}", file=sys.stderr)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as baseline_file:
+            if compare(results, json.load(baseline_file), args.tolerance):
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+GENRES = ["Fiction", "Mystery", "Fantasy", "Science", "History", "Romance", "Biography"]
+AUTHORS = ["Agatha Christie", "J. K. Rowling", "Ursula K. Le Guin", "Terry Pratchett", "Octavia E. Butler"]
+# Characters per streamed chat token
+TOKEN_CHARS = 4
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    stub = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, body=b"", content_type="application/json", headers=()):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class Stub:
+    # A local HTTP server with configurable latency (ms, +/- jitter) and error rate
+
+    handler = _Handler
+
+    def __init__(self, latency_ms=50.0, jitter_ms=10.0, error_rate=0.0, seed=0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.requests = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def start(self):
+        handler = type(self.handler.__name__, (self.handler,), {"stub": self})
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def delay_and_roll(self):
+        # Sleeps the simulated upstream latency; returns True when this request should fail
+        with self._lock:
+            self.requests += 1
+            delay = max(0.0, self._random.gauss(self.latency_ms, self.jitter_ms)) / 1000
+            failed = self._random.random() < self.error_rate
+        time.sleep(delay)
+        return failed
+
+
+class _BooksHandler(_Handler):
+    def do_GET(self):
+        url = urlparse(self.path)
+        if not url.path.endswith("/books/v1/volumes"):
+            self._reply(404)
+            return
+        if self.stub.delay_and_roll():
+            self._reply(503, b'{"error": {"code": 503, "message": "Backend Error"}}')
+            return
+        params = parse_qs(url.query)
+        query = params.get("q", [""])[0]
+        start = int(params.get("startIndex", ["0"])[0])
+        count = min(40, int(params.get("maxResults", ["10"])[0]))
+        body = json.dumps(books_response(query, start, count)).encode("utf-8")
+        self._reply(200, body)
+
+
+def books_response(query, start, count, total=200):
+    # Deterministic /books/v1/volumes payload shaped like the real one
+    items = []
+    for index in range(start, min(start + count, total)):
+        digest = hashlib.sha1(f"{query}|{index}".encode("utf-8")).hexdigest()
+        items.append({
+            "kind": "books#volume",
+            "id": digest[:12],
+            "etag": digest[12:23],
+            "volumeInfo": {
+                "title": f"{query.title()} Volume {index + 1}",
+                "authors": [AUTHORS[int(digest[0], 16) % len(AUTHORS)]],
+                "publishedDate": str(1950 + int(digest[1:3], 16) % 70),
+                "description": f"A benchmark volume about {query}. " * 8,
+                "categories": [GENRES[int(digest[3], 16) % len(GENRES)]],
+                "imageLinks": {"thumbnail": f"http://books.example/{digest[:12]}.jpg"},
+                "previewLink": f"http://books.example/preview/{digest[:12]}",
+                "industryIdentifiers": [{"type": "ISBN_13", "identifier": "978" + str(int(digest[:9], 16))[:10]}],
+            },
+            "saleInfo": {"country": "US", "saleability": "NOT_FOR_SALE", "isEbook": False},
+            "accessInfo": {"country": "US", "viewability": "PARTIAL", "embeddable": True},
+            "searchInfo": {"textSnippet": f"Snippet for {query}"},
+        })
+    return {"kind": "books#volumes", "totalItems": total, "items": items}
+
+
+class BooksStub(Stub):
+    handler = _BooksHandler
+
+    @property
+    def volumes_url(self):
+        return self.url + "/books/v1/volumes"
+
+
+class _ChatHandler(_Handler):
+    def do_POST(self):
+        if not self.path.endswith("/chat/completions"):
+            self._reply(404)
+            return
+        length = int(self.headers.get("Content-Length", "0"))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if self.stub.delay_and_roll():
+            self._reply(500, b'{"error": {"message": "Internal error", "type": "server_error"}}')
+            return
+        prompt = request.get("messages", [{}])[-1].get("content", "")
+        response = chat_response(request.get("model", ""), prompt, request.get("max_tokens"))
+        if request.get("stream"):
+            self._stream(response)
+        else:
+            self._reply(200, json.dumps(response).encode("utf-8"))
+
+    def _stream(self, response):
+        # Server-sent chat.completion.chunk events, a few characters per token
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        content = response["choices"][0]["message"]["content"]
+        pieces = [content[i:i + TOKEN_CHARS] for i in range(0, len(content), TOKEN_CHARS)]
+        for index, piece in enumerate(pieces):
+            last = index == len(pieces) - 1
+            chunk = {
+                "id": response["id"],
+                "object": "chat.completion.chunk",
+                "created": response["created"],
+                "model": response["model"],
+                "choices": [{
+                    "index": 0,
+                    "delta": {"role": "assistant", "content": piece} if index == 0 else {"content": piece},
+                    "finish_reason": response["choices"][0]["finish_reason"] if last else None,
+                    "logprobs": None,
+                }],
+            }
+            if last:
+                chunk["x_groq"] = {"id": response["id"], "usage": response["usage"]}
+            if not self._event(json.dumps(chunk).encode("utf-8")):
+                return
+            time.sleep(self.stub.token_interval_ms / 1000)
+        self._event(b"[DONE]")
+
+    def _event(self, data):
+        try:
+            self.wfile.write(b"data: " + data + b"\n\n")
+            self.wfile.flush()
+            return True
+        except OSError:
+            # The client stops reading once it has every field it needs
+            self.close_connection = True
+            return False
+
+
+def _intent(prompt):
+    digest = hashlib.sha1(prompt.encode("utf-8")).hexdigest()
+    return {
+        "genre": GENRES[int(digest[0], 16) % len(GENRES)].lower(),
+        "author": AUTHORS[int(digest[1], 16) % len(AUTHORS)],
+        "length": ["short", "medium", "long"][int(digest[2], 16) % 3],
+    }
+
+
+def chat_response(model, prompt, max_tokens=None):
+    # OpenAI-compatible chat.completion, as returned by Groq. A prompt that is
+    # a JSON array of {"id", "prompt"} (a micro-batch) gets {"intents": [...]}
+    # back. Replies longer than max_tokens are cut off, as Groq does.
+    digest = hashlib.sha1(prompt.encode("utf-8")).hexdigest()
+    try:
+        batch = json.loads(prompt)
+    except ValueError:
+        batch = None
+    if isinstance(batch, list):
+        content = json.dumps({"intents": [dict(id=entry["id"], **_intent(entry["prompt"])) for entry in batch]})
+    else:
+        content = json.dumps(_intent(prompt))
+    completion_tokens = -(-len(content) // TOKEN_CHARS)
+    finish_reason = "stop"
+    if max_tokens and completion_tokens > max_tokens:
+        content, completion_tokens, finish_reason = content[:max_tokens * TOKEN_CHARS], max_tokens, "length"
+    prompt_tokens = -(-len(prompt) // TOKEN_CHARS)
+    return {
+        "id": "chatcmpl-" + digest[:24],
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": finish_reason,
+            "logprobs": None,
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+class ChatStub(Stub):
+    handler = _ChatHandler
+    # Delay between streamed tokens; latency_ms is the time to the first one
+    token_interval_ms = 10.0
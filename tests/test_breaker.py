@@ -0,0 +1,77 @@
+import pytest
+from universal_pages import breaker
+from universal_pages.breaker import CircuitBreaker
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(breaker.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_opens_after_consecutive_failures(clock):
+    circuit = CircuitBreaker(failure_threshold=3, cooldown=10)
+    circuit.record_failure()
+    circuit.record_failure()
+    circuit.record_success()
+    circuit.record_failure()
+    circuit.record_failure()
+    assert circuit.state == CircuitBreaker.CLOSED
+    circuit.record_failure()
+    assert circuit.state == CircuitBreaker.OPEN
+    assert circuit.stats()["opened"] == 1
+
+
+def test_open_rejects_until_cooldown_then_allows_one_trial(clock):
+    circuit = CircuitBreaker(failure_threshold=1, cooldown=10)
+    circuit.record_failure()
+    assert not circuit.allow()
+    clock[0] += 10
+    assert circuit.allow()
+    assert circuit.state == CircuitBreaker.HALF_OPEN
+    assert not circuit.allow()
+    assert circuit.stats()["bypassed"] == 2
+
+
+def test_trial_success_closes(clock):
+    circuit = CircuitBreaker(failure_threshold=1, cooldown=10)
+    circuit.record_failure()
+    clock[0] += 10
+    assert circuit.allow()
+    circuit.record_success()
+    assert circuit.state == CircuitBreaker.CLOSED
+    assert circuit.allow()
+
+
+def test_trial_failure_reopens_for_another_cooldown(clock):
+    circuit = CircuitBreaker(failure_threshold=3, cooldown=10)
+    for _ in range(3):
+        circuit.record_failure()
+    clock[0] += 10
+    assert circuit.allow()
+    circuit.record_failure()
+    assert circuit.state == CircuitBreaker.OPEN
+    clock[0] += 5
+    assert not circuit.allow()
+    clock[0] += 5
+    assert circuit.allow()
+
+
+def test_abandoned_trial_reopens_and_lets_the_next_call_try():
+    # A trial that never reached the upstream (e.g. throttled) must not leave
+    # the circuit half-open with nobody to close it
+    circuit = CircuitBreaker(failure_threshold=1, cooldown=0)
+    circuit.record_failure()
+    assert circuit.allow()
+    circuit.record_abandoned()
+    assert circuit.state == CircuitBreaker.OPEN
+    assert circuit.allow()
+    assert circuit.state == CircuitBreaker.HALF_OPEN
+
+
+def test_abandoned_is_a_no_op_when_closed():
+    circuit = CircuitBreaker(failure_threshold=1, cooldown=10)
+    circuit.record_abandoned()
+    assert circuit.state == CircuitBreaker.CLOSED
+    assert circuit.allow()
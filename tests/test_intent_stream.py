@@ -0,0 +1,101 @@
+import pytest
+from universal_pages.intent_stream import IntentStreamParser
+
+REPLY = '{"genre": "mystery", "author": "Agatha Christie", "length": "short"}'
+
+
+def feed_in_pieces(parser, text, size):
+    for start in range(0, len(text), size):
+        parser.feed(text[start:start + size])
+
+
+@pytest.mark.parametrize("size", [1, 3, 7, len(REPLY)])
+def test_fields_arrive_however_the_reply_is_split(size):
+    parser = IntentStreamParser()
+    feed_in_pieces(parser, REPLY, size)
+    assert parser.done
+    assert parser.result() == {"genre": "mystery", "author": "Agatha Christie", "length": "short"}
+
+
+def test_a_field_is_reported_once_its_closing_quote_arrives():
+    parser = IntentStreamParser()
+    assert parser.feed('{"genre": "myst') == []
+    assert parser.result()["genre"] == ""
+    assert parser.feed('ery", "auth') == [0]
+    assert parser.result()["genre"] == "mystery"
+    assert not parser.done
+
+
+def test_escapes_and_null_values():
+    parser = IntentStreamParser()
+    parser.feed('{"genre": "sci-\\"fi\\"", "author": null, "length": "long"}')
+    assert parser.done
+    assert parser.result() == {"genre": 'sci-"fi"', "author": "", "length": "long"}
+
+
+def test_first_value_wins_and_unknown_keys_are_ignored():
+    parser = IntentStreamParser()
+    parser.feed('{"mood": "dark", "genre": "horror", "genre": "humor"}')
+    assert parser.result()["genre"] == "horror"
+    assert "mood" not in parser.result()
+
+
+def test_prose_and_code_fences_around_the_json():
+    parser = IntentStreamParser()
+    parser.feed('Sure! ```json\n' + REPLY + '\n``` Hope that helps.')
+    assert parser.done
+
+
+def test_truncated_reply_leaves_missing_fields_empty():
+    parser = IntentStreamParser()
+    parser.feed('{"genre": "romance", "author": "Jane Aus')
+    parser.finish()
+    assert not parser.done
+    assert parser.found[0] == {"genre"}
+    assert parser.result() == {"genre": "romance", "author": "", "length": ""}
+
+
+def test_finish_ignores_a_reply_that_is_not_json():
+    parser = IntentStreamParser()
+    parser.feed("I can't help with that.")
+    parser.finish()
+    assert parser.result() == {"genre": "", "author": "", "length": ""}
+
+
+BATCH_REPLY = (
+    '{"intents": [{"id": 0, "genre": "mystery", "author": "", "length": "short"}, '
+    '{"id": 1, "genre": "fantasy", "author": "Tolkien", "length": "long"}]}'
+)
+
+
+@pytest.mark.parametrize("size", [1, 5, len(BATCH_REPLY)])
+def test_batch_reply_is_split_by_id(size):
+    parser = IntentStreamParser(count=2)
+    feed_in_pieces(parser, BATCH_REPLY, size)
+    assert parser.done
+    assert parser.result(0) == {"genre": "mystery", "author": "", "length": "short"}
+    assert parser.result(1) == {"genre": "fantasy", "author": "Tolkien", "length": "long"}
+
+
+def test_batch_reports_which_intent_changed():
+    parser = IntentStreamParser(count=2)
+    assert parser.feed('{"intents": [{"id": 1, "genre": "horror"') == [1]
+    assert parser.feed(', "author": "King", "length": "long"}, {"id": 0, "genre": "poetry"') == [0, 1]
+
+
+def test_batch_ignores_out_of_range_ids():
+    parser = IntentStreamParser(count=2)
+    parser.feed('{"intents": [{"id": 0, "genre": "a"}, {"id": 7, "genre": "b"}]}')
+    assert parser.result(0)["genre"] == "a"
+    assert parser.result(1)["genre"] == ""
+
+
+def test_finish_places_intents_without_ids_by_position():
+    parser = IntentStreamParser(count=2)
+    parser.feed(
+        '{"intents": [{"genre": "mystery", "author": "", "length": ""}, '
+        '{"genre": "fantasy", "author": "", "length": ""}]}'
+    )
+    parser.finish()
+    assert parser.done
+    assert parser.result(1)["genre"] == "fantasy"
@@ -0,0 +1,69 @@
+import threading
+import pytest
+from universal_pages.microbatch import MicroBatcher
+
+
+def echo(items, emit):
+    return [item * 2 for item in items]
+
+
+def test_calls_within_the_window_share_one_batch():
+    calls = []
+
+    def fn(items, emit):
+        calls.append(list(items))
+        return echo(items, emit)
+
+    batcher = MicroBatcher(fn, window=0.05, max_size=8)
+    futures = [batcher.submit(i) for i in range(3)]
+    assert [future.result(timeout=2) for future in futures] == [0, 2, 4]
+    assert calls == [[0, 1, 2]]
+    assert batcher.stats()["batches"] == 1
+
+
+def test_full_batch_dispatches_without_waiting_for_the_window():
+    batcher = MicroBatcher(echo, window=60, max_size=2)
+    futures = [batcher.submit(i) for i in range(2)]
+    assert [future.result(timeout=2) for future in futures] == [0, 2]
+
+
+def test_emitted_results_are_delivered_before_the_batch_ends():
+    release = threading.Event()
+
+    def fn(items, emit):
+        emit(0, "early")
+        release.wait(2)
+        return ["ignored"]
+
+    batcher = MicroBatcher(fn, window=0, max_size=1)
+    first = batcher.submit("a")
+    assert first.result(timeout=2) == "early"
+    release.set()
+
+
+def test_exception_fails_only_what_was_not_emitted():
+    def fn(items, emit):
+        emit(0, "kept")
+        raise ValueError("boom")
+
+    batcher = MicroBatcher(fn, window=60, max_size=2)
+    kept, failed = batcher.submit("a"), batcher.submit("b")
+    assert kept.result(timeout=2) == "kept"
+    with pytest.raises(ValueError):
+        failed.result(timeout=2)
+
+
+def test_submit_after_shutdown_fails_the_future():
+    batcher = MicroBatcher(echo, window=0, max_size=8)
+    batcher._executor.shutdown()
+    with pytest.raises(RuntimeError):
+        batcher.submit(1).result(timeout=2)
+
+
+def test_timer_dispatch_after_shutdown_fails_the_futures():
+    # The timer thread used to swallow the error and leave callers waiting forever
+    batcher = MicroBatcher(echo, window=0.02, max_size=8)
+    future = batcher.submit(1)
+    batcher._executor.shutdown()
+    with pytest.raises(RuntimeError):
+        future.result(timeout=2)
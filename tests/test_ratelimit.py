@@ -0,0 +1,128 @@
+import threading
+import time
+from email.utils import formatdate
+import pytest
+from universal_pages import ratelimit
+from universal_pages.ratelimit import RateLimited, TokenBucket, UpstreamLimiter, parse_retry_after
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(ratelimit.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_bucket_allows_a_burst_then_paces_at_the_rate():
+    bucket = TokenBucket(rate=2, burst=3)
+    now = bucket._updated
+    assert [bucket.take(now) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.take(now) == pytest.approx(0.5)
+    assert bucket.take(now + 0.5) == 0.0
+
+
+def test_bucket_refill_is_capped_at_the_burst():
+    bucket = TokenBucket(rate=10, burst=2)
+    now = bucket._updated + 60
+    assert [bucket.take(now) for _ in range(2)] == [0.0, 0.0]
+    assert bucket.take(now) > 0
+
+
+def test_pause_holds_every_token_until_it_ends():
+    bucket = TokenBucket(rate=100, burst=100)
+    now = bucket._updated
+    bucket.pause(now, 5)
+    assert bucket.take(now + 1) == pytest.approx(4)
+    assert bucket.take(now + 5.01) == 0.0
+
+
+def test_zero_rate_is_unlimited_but_still_pauses():
+    bucket = TokenBucket(rate=0, burst=0)
+    now = bucket._updated
+    assert all(bucket.take(now) == 0.0 for _ in range(1000))
+    bucket.pause(now, 2)
+    assert bucket.take(now + 1) == pytest.approx(1)
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("7", 7.0), ("0.5", 0.5), ("-3", 0.0), ("", None), (None, None), ("soon", None),
+])
+def test_parse_retry_after_seconds(value, expected):
+    assert parse_retry_after(value) == expected
+
+
+def test_parse_retry_after_http_date():
+    assert parse_retry_after(formatdate(time.time() + 30, usegmt=True)) == pytest.approx(30, abs=1.5)
+    assert parse_retry_after(formatdate(time.time() - 30, usegmt=True)) == 0.0
+
+
+def test_throttle_halves_the_window_and_successes_grow_it_back(clock):
+    limiter = UpstreamLimiter("test", rate=1000, burst=1000, max_concurrency=8, min_concurrency=2)
+    with limiter.slot() as slot:
+        slot.throttled("1")
+    assert limiter.stats()["limit"] == 4
+    clock[0] += 2
+    for _ in range(2):
+        with limiter.slot() as slot:
+            slot.throttled("1")
+        clock[0] += 2
+    assert limiter.stats()["limit"] == 2
+    for _ in range(2):
+        with limiter.slot():
+            pass
+    # Additive increase: 1/limit per success
+    assert limiter.stats()["limit"] == pytest.approx(2 + 1 / 2 + 1 / 2.5, abs=0.01)
+    assert limiter.stats()["throttled"] == 3
+
+
+def test_window_never_grows_past_max_concurrency():
+    limiter = UpstreamLimiter("test", rate=1000, burst=1000, max_concurrency=3)
+    for _ in range(10):
+        with limiter.slot():
+            pass
+    assert limiter.stats()["limit"] == 3
+
+
+def test_retry_after_pauses_new_slots():
+    limiter = UpstreamLimiter("test", rate=1000, burst=1000, max_concurrency=4, max_wait=0.05)
+    with limiter.slot() as slot:
+        slot.throttled("30")
+    with pytest.raises(RateLimited):
+        with limiter.slot():
+            pass
+    assert limiter.stats()["rejected"] == 1
+
+
+def test_wait_for_a_slot_is_bounded_by_max_wait():
+    limiter = UpstreamLimiter("test", rate=1000, burst=1000, max_concurrency=1, max_wait=0.1)
+    with limiter.slot():
+        started = time.perf_counter()
+        with pytest.raises(RateLimited) as exc:
+            with limiter.slot():
+                pass
+        waited = time.perf_counter() - started
+    assert exc.value.upstream == "test"
+    assert 0.05 <= waited < 1.0
+    assert limiter.stats()["in_flight"] == 0
+
+
+def test_release_wakes_a_waiting_caller():
+    limiter = UpstreamLimiter("test", rate=1000, burst=1000, max_concurrency=1, max_wait=2)
+    entered = threading.Event()
+    release = threading.Event()
+
+    def hold():
+        with limiter.slot():
+            entered.set()
+            release.wait(2)
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    entered.wait(2)
+    threading.Timer(0.05, release.set).start()
+    started = time.perf_counter()
+    with limiter.slot():
+        assert limiter.stats()["in_flight"] == 1
+    holder.join(2)
+    assert time.perf_counter() - started < 1.0
+    assert limiter.stats()["granted"] == 2
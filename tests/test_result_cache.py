@@ -0,0 +1,111 @@
+import pytest
+from universal_pages import result_cache
+from universal_pages.result_cache import TwoTierCache, normalize_query
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(result_cache.time, "time", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "cache.sqlite3")
+
+
+def test_normalize_query_folds_case_and_whitespace():
+    assert normalize_query("  Harry   POTTER ") == "harry potter"
+
+
+def test_entries_expire_after_the_ttl(clock, path):
+    cache = TwoTierCache(path, ttl=60)
+    cache.set("key", ["a"])
+    clock[0] += 59
+    assert cache.get("key") == ["a"]
+    clock[0] += 1
+    assert cache.get("key") is None
+    assert cache.stats()["misses"] == 1
+
+
+def test_lookup_returns_the_expiry(clock, path):
+    cache = TwoTierCache(path, ttl=60)
+    cache.set("key", ["a"])
+    assert cache.lookup("key") == (["a"], clock[0] + 60)
+
+
+def test_memory_tier_is_an_lru_backed_by_disk(clock, path):
+    cache = TwoTierCache(path, ttl=60, max_memory_entries=2)
+    for key in ("a", "b", "c"):
+        cache.set(key, [key])
+    assert cache.stats()["memory_entries"] == 2
+    assert cache.get("b") == ["b"]
+    assert cache.get("a") == ["a"]
+    stats = cache.stats()
+    assert (stats["memory_hits"], stats["disk_hits"], stats["disk_entries"]) == (1, 1, 3)
+
+
+def test_disk_entry_keeps_its_original_expiry_across_restarts(clock, path):
+    TwoTierCache(path, ttl=60).set("key", {"books": [], "total_items": 3})
+    clock[0] += 30
+    cache = TwoTierCache(path, ttl=60, decode=lambda value: dict(value, decoded=True))
+    assert cache.lookup("key") == ({"books": [], "total_items": 3, "decoded": True}, clock[0] + 30)
+    clock[0] += 30
+    assert cache.get("key") is None
+
+
+def test_disk_tier_evicts_least_recently_accessed(clock, path):
+    cache = TwoTierCache(path, ttl=600, max_memory_entries=1, max_disk_entries=2)
+    cache.set("a", ["a"])
+    clock[0] += 1
+    cache.set("b", ["b"])
+    clock[0] += 1
+    assert cache.get("a") == ["a"]
+    clock[0] += 1
+    cache.set("c", ["c"])
+    assert cache.stats()["disk_entries"] == 2
+    reopened = TwoTierCache(path, ttl=600)
+    assert reopened.get("b") is None
+    assert reopened.get("a") == ["a"]
+
+
+def test_clear_empties_both_tiers(clock, path):
+    cache = TwoTierCache(path, ttl=60)
+    cache.set("key", ["a"])
+    cache.clear()
+    assert cache.get("key") is None
+    assert TwoTierCache(path, ttl=60).get("key") is None
+
+
+def test_stale_lookup_serves_expired_entries_within_stale_ttl(clock, path):
+    cache = TwoTierCache(path, ttl=60, stale_ttl=600)
+    cache.set("key", ["a"])
+    expires_at = clock[0] + 60
+    clock[0] += 61
+    assert cache.lookup("key") is None
+    assert cache.lookup("key", stale=True) == (["a"], expires_at)
+    assert cache.stats()["stale_hits"] == 1
+    clock[0] += 600
+    assert cache.lookup("key", stale=True) is None
+
+
+def test_stale_entries_survive_a_restart_until_stale_ttl(clock, path):
+    TwoTierCache(path, ttl=60, stale_ttl=600).set("key", ["a"])
+    clock[0] += 120
+    cache = TwoTierCache(path, ttl=60, stale_ttl=600)
+    assert cache.get("key") is None
+    assert cache.lookup("key", stale=True)[0] == ["a"]
+    stats = cache.stats()
+    assert (stats["stale_hits"], stats["disk_hits"]) == (1, 0)
+
+
+def test_writes_evict_only_entries_past_stale_ttl(clock, path):
+    cache = TwoTierCache(path, ttl=60, stale_ttl=600)
+    cache.set("old", ["old"])
+    clock[0] += 120
+    cache.set("new", ["new"])
+    assert cache.stats()["disk_entries"] == 2
+    clock[0] += 600
+    cache.set("newer", ["newer"])
+    assert cache.stats()["disk_entries"] == 2
@@ -0,0 +1,73 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from universal_pages.singleflight import SingleFlight
+
+
+def test_concurrent_calls_with_one_key_share_one_call():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def fetch(value):
+        calls.append(value)
+        started.set()
+        release.wait(2)
+        return [value]
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        leader = pool.submit(flight.do, "key", fetch, 1)
+        started.wait(2)
+        followers = [pool.submit(flight.do, "key", fetch, 2) for _ in range(3)]
+        # Followers are queued on the leader's future before it finishes
+        while flight.stats()["coalesced"] < 3:
+            time.sleep(0.01)
+        release.set()
+        results = [leader.result(timeout=2)] + [future.result(timeout=2) for future in followers]
+    assert calls == [1]
+    assert results == [[1]] * 4
+    # Every caller gets the same object
+    assert all(result is results[0] for result in results)
+    assert flight.stats() == {"calls": 1, "coalesced": 3, "in_flight": 0}
+
+
+def test_different_keys_run_separately():
+    flight = SingleFlight()
+    assert flight.do("a", lambda: "a") == "a"
+    assert flight.do("b", lambda: "b") == "b"
+    assert flight.stats()["calls"] == 2
+
+
+def test_sequential_calls_are_not_coalesced():
+    flight = SingleFlight()
+    calls = []
+    for _ in range(2):
+        flight.do("key", calls.append, 1)
+    assert calls == [1, 1]
+    assert flight.stats()["coalesced"] == 0
+
+
+def test_exception_reaches_every_waiter_and_clears_the_key():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+
+    def fail():
+        started.set()
+        release.wait(2)
+        raise ValueError("boom")
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        leader = pool.submit(flight.do, "key", fail)
+        started.wait(2)
+        follower = pool.submit(flight.do, "key", fail)
+        while flight.stats()["coalesced"] < 1:
+            time.sleep(0.01)
+        release.set()
+        for future in (leader, follower):
+            with pytest.raises(ValueError):
+                future.result(timeout=2)
+    assert flight.stats()["in_flight"] == 0
+    assert flight.do("key", lambda: "retried") == "retried"
@@ -0,0 +1,2 @@
+# Search core for the Universal Pages Streamlit app. Heavy dependencies
+# (groq, numpy, fuzzywuzzy) are imported on first use, not on package import.
@@ -0,0 +1,109 @@
+import gzip
+import hashlib
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from .config import ASSET_SERVER_ENABLED, ASSET_HOST, ASSET_PORT, ASSET_PUBLIC_URL
+from .resources import Resource
+
+logger = logging.getLogger(__name__)
+
+# Content-hashed URLs never change meaning, so browsers may keep them for a year
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+_assets = {}
+_assets_lock = threading.Lock()
+_routes = []
+
+
+def register(path, body, content_type):
+    # Serves `body` at `path` with a strong ETag and a pre-gzipped copy
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    etag = '"%s"' % hashlib.sha256(body).hexdigest()[:16]
+    with _assets_lock:
+        _assets[path] = (content_type, body, gzip.compress(body, 9), etag)
+
+
+def add_route(prefix, handler):
+    # handler(path, headers) returns (status, content_type, body, cache_control, etag)
+    _routes.append((prefix, handler))
+
+
+class AssetHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        logger.debug(format, *args)
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        asset = _assets.get(path)
+        if asset is None:
+            self._route(path)
+            return
+        content_type, body, gzipped, etag = asset
+        if self.headers.get("If-None-Match") == etag:
+            self._send(304, content_type, b"", etag=etag)
+            return
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            self._send(200, content_type, gzipped, etag=etag, encoding="gzip")
+        else:
+            self._send(200, content_type, body, etag=etag)
+
+    def _route(self, path):
+        for prefix, handler in _routes:
+            if path.startswith(prefix):
+                status, content_type, body, cache, etag = handler(path[len(prefix):], self.headers)
+                if etag and self.headers.get("If-None-Match") == etag:
+                    self._send(304, content_type, b"", etag=etag, cache=cache)
+                else:
+                    self._send(status, content_type, body, etag=etag, cache=cache)
+                return
+        self._send(404, "text/plain", b"Not found", cache="no-store")
+
+    def _send(self, status, content_type, body, etag=None, encoding=None, cache=IMMUTABLE):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", cache)
+        # The Streamlit page lives on another port, so allow cross-origin loads
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.send_header("Vary", "Accept-Encoding")
+        if etag:
+            self.send_header("ETag", etag)
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def _start_server():
+    if not ASSET_SERVER_ENABLED:
+        return None
+    try:
+        server = ThreadingHTTPServer((ASSET_HOST, ASSET_PORT), AssetHandler)
+    except OSError as exc:
+        logger.warning("Asset server not started on %s:%s (%s)", ASSET_HOST, ASSET_PORT, exc)
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="asset-server", daemon=True).start()
+    return server
+
+
+_server = Resource(lambda: _start_server() or False)
+
+
+def is_serving():
+    # Starts the server on first call; False when disabled or the port is taken
+    return bool(_server.get())
+
+
+def is_public():
+    # Whether pages may link to the server: it is up and browsers have a URL for
+    # it. Starts it either way, since /metrics is served from it too.
+    return is_serving() and bool(ASSET_PUBLIC_URL)
+
+
+def url_for(path):
+    return ASSET_PUBLIC_URL.rstrip("/") + path
@@ -0,0 +1,149 @@
+import argparse
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from .books_api import get_multiple_books
+from .config import SEARCH_TIMEOUT
+from .ratelimit import UpstreamUnavailable
+from .search import run_search
+
+STAGES = ("intent", "books", "total")
+
+
+class Pacer:
+    # Spaces calls evenly so the batch never exceeds `rate` queries per second
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next, now)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def _timed(stage, fn, timings, only=None):
+    # With `only`, calls for other queries (fan-out sub-queries) run untimed
+    def call(query, **kwargs):
+        if only is not None and query != only:
+            return fn(query, **kwargs)
+        start = time.perf_counter()
+        try:
+            return fn(query, **kwargs)
+        finally:
+            timings[stage] = (time.perf_counter() - start) * 1000
+    return call
+
+
+def run_query(query, ask, max_results, pacer, executor):
+    pacer.wait()
+    timings = {}
+    start = time.perf_counter()
+    error = None
+    try:
+        # Nobody is waiting on a page, so the LLM gets the whole deadline rather than the interactive slice
+        intent, books = run_search(
+            query,
+            _timed("intent", ask, timings),
+            _timed("books", lambda q: get_multiple_books(q, max_results), timings, only=query),
+            intent_budget=SEARCH_TIMEOUT,
+            executor=executor,
+        )
+    except UpstreamUnavailable as exc:
+        intent, books, error = {}, [], str(exc)
+    timings["total"] = (time.perf_counter() - start) * 1000
+    result = {
+        "query": query,
+        "intent": intent,
+        "books": [book._asdict() for book in books],
+        "timings_ms": {stage: round(ms, 3) for stage, ms in timings.items()},
+    }
+    if error:
+        result["error"] = error
+    return result
+
+
+def read_queries(source):
+    for line in source:
+        query = line.strip()
+        if query and not query.startswith("#"):
+            yield query
+
+
+def run_batch(queries, output, ask, concurrency=8, rate=0.0, max_results=5):
+    pacer = Pacer(rate)
+    latencies = {stage: [] for stage in STAGES}
+    completed = 0
+    start = time.perf_counter()
+    # Each query fans out into an intent and a books task, hence the inner pool is twice as wide
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch") as workers, \
+            ThreadPoolExecutor(max_workers=concurrency * 2, thread_name_prefix="batch-stage") as stages:
+        futures = [
+            workers.submit(run_query, query, ask, max_results, pacer, stages)
+            for query in queries
+        ]
+        for future in as_completed(futures):
+            result = future.result()
+            output.write(json.dumps(result) + "\n")
+            output.flush()
+            completed += 1
+            for stage, ms in result["timings_ms"].items():
+                latencies[stage].append(ms)
+    elapsed = time.perf_counter() - start
+    return {
+        "queries": completed,
+        "seconds": round(elapsed, 3),
+        "qps": round(completed / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            stage: {f"p{pct}": round(percentile(values, pct), 3) for pct in (50, 90, 95, 99)}
+            for stage, values in latencies.items()
+        },
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run book searches headlessly and write results as JSONL.")
+    parser.add_argument("queries", nargs="?", default="-", help="file with one query per line (default: stdin)")
+    parser.add_argument("-o", "--output", default="-", help="JSONL output file (default: stdout)")
+    parser.add_argument("-c", "--concurrency", type=int, default=8, help="queries in flight at once")
+    parser.add_argument("-r", "--rate", type=float, default=0.0, help="max queries per second (0 = unlimited)")
+    parser.add_argument("-n", "--max-results", type=int, default=5, help="books per query")
+    parser.add_argument("--no-llm", action="store_true", help="skip intent extraction (e.g. to only warm the book cache)")
+    args = parser.parse_args(argv)
+
+    if args.no_llm:
+        ask = lambda query, **kwargs: {"genre": "", "author": "", "length": ""}
+    else:
+        from .camel_agent import get_agent
+        ask = get_agent().ask
+
+    source = sys.stdin if args.queries == "-" else open(args.queries, encoding="utf-8")
+    output = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        summary = run_batch(read_queries(source), output, ask, args.concurrency, args.rate, args.max_results)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if output is not sys.stdout:
+            output.close()
+    print(json.dumps(summary, indent=2), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+from typing import NamedTuple
+
+# Partial response: only the volume fields a Book keeps, so Google Books skips
+# saleInfo, accessInfo, searchInfo and the rest of volumeInfo
+VOLUME_FIELDS = (
+    "totalItems,"
+    "items(id,volumeInfo(title,authors,publishedDate,categories,description,"
+    "imageLinks/thumbnail,previewLink,industryIdentifiers))"
+)
+
+
+class Book(NamedTuple):
+    # One volume, shared by the caches, the catalog and the renderer. A tuple has
+    # no per-instance dict and serializes to a JSON array, so cached volumes don't
+    # repeat their field names.
+    id: str
+    title: str
+    author: str
+    release_date: str
+    genre: str
+    description: str
+    image_url: str
+    preview_link: str
+    # ISBN-13 when Google has one, else ISBN-10; editions with different ids share it
+    isbn: str = ""
+
+    @property
+    def moral(self):
+        return "Learn valuable lessons" if self.description != "No description available." else "No moral found"
+
+    @classmethod
+    def from_volume(cls, item):
+        volume_info = item.get("volumeInfo", {})
+        return cls(
+            id=item.get("id", ""),
+            title=volume_info.get("title", "N/A"),
+            author=", ".join(volume_info.get("authors", ["N/A"])),
+            release_date=volume_info.get("publishedDate", "N/A"),
+            genre=", ".join(volume_info.get("categories", ["N/A"])),
+            description=volume_info.get("description", "No description available."),
+            image_url=volume_info.get("imageLinks", {}).get("thumbnail", "").replace("http://", "https://"),
+            preview_link=volume_info.get("previewLink", "#"),
+            isbn=_isbn(volume_info.get("industryIdentifiers", [])),
+        )
+
+    @classmethod
+    def load(cls, value):
+        # From JSON: an array, or a dict written to a cache before Book existed
+        if isinstance(value, dict):
+            return cls(**{field: value.get(field, "") for field in cls._fields})
+        return cls(*value)
+
+
+def _isbn(identifiers):
+    by_type = {identifier.get("type"): identifier.get("identifier", "") for identifier in identifiers}
+    return by_type.get("ISBN_13") or by_type.get("ISBN_10") or ""
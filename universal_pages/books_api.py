@@ -0,0 +1,291 @@
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import requests
+from . import http_client, metrics
+from .config import (
+    GOOGLE_BOOKS_URL, CACHE_DIR, BOOK_CACHE_TTL, BOOK_CACHE_STALE_TTL,
+    BOOK_CACHE_MEMORY_ENTRIES, BOOK_CACHE_DISK_ENTRIES, FUZZY_MATCH_CUTOFF, HTTP_POOL_SIZE,
+    BOOKS_RATE_LIMIT, BOOKS_BURST, BOOKS_MAX_CONCURRENCY, UPSTREAM_MAX_WAIT,
+)
+from .book import Book, VOLUME_FIELDS
+from .result_cache import TwoTierCache, normalize_query
+from .intent_rules import gazetteer
+from .catalog import Catalog
+from .resources import Resource
+from .singleflight import SingleFlight
+from .ratelimit import RateLimited, UpstreamLimiter, UpstreamUnavailable, parse_retry_after
+
+# Largest maxResults the volumes endpoint accepts
+PAGE_SIZE = 40
+
+# Field-scoped queries (planner sub-queries) can't be typo-corrected against titles
+_OPERATORS = re.compile(r"\b(?:intitle|inauthor|inpublisher|subject|isbn):")
+
+_page_executor = ThreadPoolExecutor(max_workers=HTTP_POOL_SIZE, thread_name_prefix="books-page")
+
+# Background refreshes of expired cache entries, at most one per key at a time
+_refresh_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="books-refresh")
+_refreshing = set()
+_refresh_lock = threading.Lock()
+
+# Identical requests in flight at the same time (any session) share one upstream call
+fetch_flight = SingleFlight()
+
+books_limiter = UpstreamLimiter(
+    "Google Books", BOOKS_RATE_LIMIT, BOOKS_BURST, BOOKS_MAX_CONCURRENCY, max_wait=UPSTREAM_MAX_WAIT,
+)
+
+
+class StaleBooks(list):
+    # Results served from the cache past their TTL; stored_at is when they were fetched
+    def __init__(self, books, stored_at):
+        super().__init__(books)
+        self.stored_at = stored_at
+
+
+class PartialBooks(list):
+    # Catalog volumes that only partly match the query, served because the API couldn't answer
+    partial = True
+
+
+def _decode_entry(value):
+    # Result lists and {"books", "total_items"} pages come back from disk as JSON
+    if isinstance(value, dict):
+        return {"books": [Book.load(book) for book in value["books"]], "total_items": value["total_items"]}
+    return [Book.load(book) for book in value]
+
+
+def _open_catalog():
+    catalog = Catalog(os.path.join(CACHE_DIR, "catalog.sqlite3"))
+    for book in catalog:
+        gazetteer.add_book(book)
+    return catalog
+
+
+_book_cache = Resource(lambda: TwoTierCache(
+    os.path.join(CACHE_DIR, "books.sqlite3"),
+    ttl=BOOK_CACHE_TTL,
+    max_memory_entries=BOOK_CACHE_MEMORY_ENTRIES,
+    max_disk_entries=BOOK_CACHE_DISK_ENTRIES,
+    decode=_decode_entry,
+    stale_ttl=BOOK_CACHE_STALE_TTL,
+))
+_catalog = Resource(_open_catalog)
+
+metrics.register_stats("book_cache", lambda: get_book_cache().stats() if _book_cache.loaded else {})
+metrics.register_stats("singleflight", fetch_flight.stats, upstream=books_limiter.name)
+metrics.register_stats("limiter", books_limiter.stats, upstream=books_limiter.name)
+
+
+def get_book_cache():
+    return _book_cache.get()
+
+
+def get_catalog():
+    return _catalog.get()
+
+
+def get_multiple_books(book_name, max_results=5):
+    with metrics.span("books") as span:
+        return _get_multiple_books(book_name, max_results, span)
+
+
+def _get_multiple_books(book_name, max_results, span):
+    book_cache = get_book_cache()
+    catalog = get_catalog()
+    key = f"{normalize_query(book_name)}|{max_results}"
+    books, fresh = _cached(book_cache, key)
+    if fresh:
+        span["source"] = "cache"
+        return books
+    if books is not None:
+        # Expired: answer now and fetch the new results for the next search
+        span["source"] = "stale"
+        _revalidate(key, lambda books, total_items: books, book_name, max_results)
+        return books
+
+    # A query fetched before (whose cache entry has since gone) is answered with
+    # the volumes it returned then, marked with their age and refreshed in the
+    # background once they are past the TTL
+    with metrics.span("books.catalog"):
+        local = catalog.results_for(normalize_query(book_name))
+    if local is not None and len(local[0]) >= max_results:
+        span["source"] = "catalog"
+        books, fetched_at = local[0][:max_results], local[1]
+        if time.time() - fetched_at < book_cache.ttl:
+            return books
+        _revalidate(key, lambda books, total_items: books, book_name, max_results)
+        return StaleBooks(books, fetched_at)
+
+    span["source"] = "upstream"
+    try:
+        # Includes the limiter queue and any wait on an identical in-flight request
+        with metrics.span("books.fetch"):
+            result = fetch_flight.do(key, _fetch_books, book_name, max_results)
+    except RateLimited:
+        # Throttled is not the same as "no books": only hide it if we have something to show
+        partial = _partial_matches(catalog, book_name, max_results)
+        if partial:
+            span["source"] = "catalog_partial"
+            return partial
+        raise
+    if result is None:
+        # Upstream is unreachable: serve whatever the catalog partially matches,
+        # and if that's nothing, say the API is down rather than "no books"
+        partial = _partial_matches(catalog, book_name, max_results)
+        if not partial:
+            raise UpstreamUnavailable(books_limiter.name)
+        span["source"] = "catalog_partial"
+        return partial
+    books = result[0]
+    book_cache.set(key, books)
+    _learn(books, normalize_query(book_name))
+    return books
+
+
+def _partial_matches(catalog, book_name, max_results):
+    # Best local effort when the API can't answer: a typo-corrected title or
+    # author, else volumes sharing any of the query's terms
+    if not _OPERATORS.search(book_name):
+        matches = catalog.fuzzy_search(book_name, limit=max_results, cutoff=FUZZY_MATCH_CUTOFF)
+        if matches:
+            return PartialBooks(matches)
+    return PartialBooks(catalog.search(book_name, limit=max_results))
+
+
+def more_like_this(key, limit=10):
+    # Answered from the local catalog's TF-IDF vectors; returns (book, similar books)
+    catalog = get_catalog()
+    with metrics.span("books.similar"):
+        return catalog.get(key), catalog.similar(key, limit)
+
+
+def get_book_page(book_name, page, page_size=PAGE_SIZE):
+    # Returns (books, total_items) for one startIndex-aligned page. Raises
+    # UpstreamUnavailable (or RateLimited) rather than passing off a failed
+    # fetch as an empty last page
+    with metrics.span("books.page", page=page):
+        book_cache = get_book_cache()
+        key = f"{normalize_query(book_name)}|{page_size}|@{page * page_size}"
+        cached, fresh = _cached(book_cache, key)
+        if cached is not None:
+            if not fresh:
+                _revalidate(key, _page_entry, book_name, page_size, page * page_size)
+            return cached["books"], cached["total_items"]
+
+        result = fetch_flight.do(key, _fetch_books, book_name, page_size, start_index=page * page_size)
+        if result is None:
+            raise UpstreamUnavailable(books_limiter.name)
+        books, total_items = result
+        book_cache.set(key, _page_entry(books, total_items))
+        _learn(books, normalize_query(book_name) if page == 0 else None)
+        return books, total_items
+
+
+def _page_entry(books, total_items):
+    return {"books": books, "total_items": total_items}
+
+
+def _cached(book_cache, key):
+    # (value, fresh); an expired value comes back wrapped in StaleBooks
+    with metrics.span("books.cache") as span:
+        entry = book_cache.lookup(key, stale=True)
+        if entry is None:
+            result, value, fresh = "miss", None, False
+        else:
+            value, expires_at = entry
+            fresh = expires_at > time.time()
+            result = "hit" if fresh else "stale"
+            if not fresh:
+                stored_at = expires_at - book_cache.ttl
+                if isinstance(value, dict):
+                    value = dict(value, books=StaleBooks(value["books"], stored_at))
+                else:
+                    value = StaleBooks(value, stored_at)
+        span["result"] = result
+    metrics.incr("cache_requests_total", cache="books", result=result)
+    return value, fresh
+
+
+def _revalidate(key, entry, book_name, max_results, start_index=0):
+    # entry(books, total_items) builds the value cached for `key`
+    with _refresh_lock:
+        if key in _refreshing:
+            return
+        _refreshing.add(key)
+    _refresh_executor.submit(_refresh, key, entry, book_name, max_results, start_index)
+
+
+def _refresh(key, entry, book_name, max_results, start_index):
+    try:
+        try:
+            result = fetch_flight.do(key, _fetch_books, book_name, max_results, start_index=start_index)
+        except RateLimited:
+            result = None
+        # On failure the stale entry stays and keeps being served until stale_ttl runs out
+        metrics.incr("cache_refreshes_total", cache="books", result="error" if result is None else "ok")
+        if result is not None:
+            get_book_cache().set(key, entry(*result))
+            _learn(result[0], normalize_query(book_name) if not start_index else None)
+    finally:
+        with _refresh_lock:
+            _refreshing.discard(key)
+
+
+def iter_book_pages(book_name, pages, start_page=0, page_size=PAGE_SIZE):
+    # Fetches `pages` consecutive pages in parallel and yields
+    # (page, books, total_items) in the order the responses arrive. A page
+    # that fails doesn't stop the others; the first error is raised at the end.
+    futures = {
+        _page_executor.submit(metrics.bind(get_book_page), book_name, page, page_size): page
+        for page in range(start_page, start_page + pages)
+    }
+    error = None
+    for future in as_completed(futures):
+        try:
+            books, total_items = future.result()
+        except UpstreamUnavailable as exc:
+            error = error or exc
+            continue
+        yield futures[future], books, total_items
+    if error is not None:
+        raise error
+
+
+def _learn(books, query=None):
+    get_catalog().add_many(books, query)
+    for book in books:
+        gazetteer.add_book(book)
+
+
+def _fetch_books(book_name, max_results, start_index=0):
+    # Returns (books, total_items), or None when the upstream failed so errors
+    # are never cached. Raises RateLimited when throttled.
+    params = {"q": book_name, "maxResults": max_results, "fields": VOLUME_FIELDS}
+    if start_index:
+        params["startIndex"] = start_index
+    try:
+        with books_limiter.slot() as slot, metrics.span("books.http"):
+            response = http_client.get(GOOGLE_BOOKS_URL, params=params)
+            if response.status_code == 429:
+                slot.throttled(response.headers.get("Retry-After"))
+    except requests.RequestException:
+        metrics.incr("upstream_requests_total", upstream=books_limiter.name, status="error")
+        return None
+    metrics.incr("upstream_requests_total", upstream=books_limiter.name, status=response.status_code)
+    if response.status_code == 429:
+        raise RateLimited(books_limiter.name, parse_retry_after(response.headers.get("Retry-After")))
+    if response.status_code != 200:
+        return None
+
+    with metrics.span("books.parse"):
+        books_data = response.json()
+    with metrics.span("books.build"):
+        return _build_books(books_data), books_data.get("totalItems", 0)
+
+
+def _build_books(books_data):
+    return [Book.from_volume(item) for item in books_data.get("items", [])]
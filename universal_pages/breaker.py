@@ -0,0 +1,64 @@
+import threading
+import time
+
+
+class CircuitBreaker:
+    # Opens after `failure_threshold` consecutive failures and rejects calls
+    # for `cooldown` seconds. After that a single trial call is let through
+    # (half-open): success closes the circuit, failure re-opens it. A trial
+    # that ends without an outcome must call record_abandoned().
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=3, cooldown=60.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+        self._stats = {"opened": 0, "bypassed": 0}
+
+    @property
+    def state(self):
+        return self._state
+
+    def allow(self):
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.cooldown:
+                self._state = self.HALF_OPEN
+                return True
+            self._stats["bypassed"] += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self._stats["opened"] += 1
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def record_abandoned(self):
+        # The call finished without telling us anything about the upstream (e.g.
+        # throttled before it was sent); a trial's slot goes to the next call
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._state = self.OPEN
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["state"] = self._state
+            stats["failures"] = self._failures
+        return stats
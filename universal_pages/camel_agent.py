@@ -0,0 +1,274 @@
+import functools
+import json
+import os
+import threading
+import time
+from . import metrics
+from .config import (
+    get_api_key, CACHE_DIR, INTENT_CACHE_SIZE, INTENT_CACHE_THRESHOLD, INTENT_CACHE_PERSIST,
+    LOCAL_INTENT_CONFIDENCE, GROQ_RATE_LIMIT, GROQ_BURST, GROQ_MAX_CONCURRENCY, UPSTREAM_MAX_WAIT,
+    LLM_BUDGET, GROQ_TIMEOUT, GROQ_BASE_URL, LLM_BREAKER_THRESHOLD, LLM_BREAKER_COOLDOWN,
+    LLM_BATCH_WINDOW_MS, LLM_BATCH_MAX, LLM_MODEL, LLM_FAST_MODEL, LLM_FAST_MAX_WORDS, LLM_MAX_TOKENS,
+)
+from .intent_cache import IntentCache, normalize_prompt
+from .intent_stream import IntentStreamParser
+from .microbatch import MicroBatcher
+from .intent_rules import extract_intent
+from .resources import Resource
+from .routing import ModelRouter
+from .singleflight import SingleFlight
+from .ratelimit import RateLimited, UpstreamLimiter
+from .breaker import CircuitBreaker
+
+# Concurrent identical prompts (after normalization) share one Groq call
+llm_flight = SingleFlight()
+
+llm_limiter = UpstreamLimiter(
+    "Groq", GROQ_RATE_LIMIT, GROQ_BURST, GROQ_MAX_CONCURRENCY, max_wait=UPSTREAM_MAX_WAIT,
+)
+
+SYSTEM_PROMPT = (
+    "You're a helpful book assistant. "
+    "Extract the genre, author, and length from the user's prompt. "
+    "Return only a JSON object like: "
+    '{"genre": "mystery", "author": "Agatha Christie", "length": "short"}'
+)
+
+BATCH_SYSTEM_PROMPT = (
+    "You're a helpful book assistant. "
+    "The user sends a JSON array of numbered prompts. For each one, extract the genre, author, and length. "
+    "Return only a JSON object whose intents array has one object per prompt, in order, each starting with its id, like: "
+    '{"intents": [{"id": 0, "genre": "mystery", "author": "Agatha Christie", "length": "short"}]}'
+)
+
+# Longest a prompt waits on its batch: a full limiter queue, then a request that runs to GROQ_TIMEOUT
+LLM_WAIT = UPSTREAM_MAX_WAIT + GROQ_TIMEOUT
+
+# Calls slower than LLM_BUDGET count as failures: a search can't use them anyway
+llm_breaker = CircuitBreaker(LLM_BREAKER_THRESHOLD, LLM_BREAKER_COOLDOWN)
+
+metrics.register_stats("singleflight", llm_flight.stats, upstream=llm_limiter.name)
+metrics.register_stats("limiter", llm_limiter.stats, upstream=llm_limiter.name)
+metrics.register_stats("breaker", llm_breaker.stats, upstream=llm_limiter.name)
+
+class Agent:
+    def __init__(self, cache=None):
+        self._api_key = get_api_key()
+        # groq (and its httpx stack) is only imported once a prompt needs the LLM
+        self._client = Resource(self._build_client)
+        if cache is None:
+            cache = IntentCache(
+                max_entries=INTENT_CACHE_SIZE,
+                threshold=INTENT_CACHE_THRESHOLD,
+                path=os.path.join(CACHE_DIR, "intents.sqlite3") if INTENT_CACHE_PERSIST else None,
+            )
+        self.cache = cache
+        # How each prompt was answered: memo cache, local rules or the LLM
+        self.path_counts = {"cache": 0, "local": 0, "llm": 0, "bypass": 0}
+        self._path_lock = threading.Lock()
+        self.router = ModelRouter(LLM_FAST_MODEL, LLM_MODEL, LLM_FAST_MAX_WORDS, budget=LLM_BUDGET)
+        # Prompts routed to the same model that arrive within the window share one request
+        self._batchers = {
+            model: MicroBatcher(
+                functools.partial(self._extract_intents, model), LLM_BATCH_WINDOW_MS / 1000, LLM_BATCH_MAX,
+                max_workers=GROQ_MAX_CONCURRENCY, name="llm-batch",
+            )
+            for model in self.router.models
+        }
+        # Models that rejected JSON mode together with streaming; asked without streaming
+        self._unstreamable = set()
+        metrics.register_stats("intent_cache", self.cache.stats)
+        for model, stats in self.router.models.items():
+            metrics.register_stats("llm_batcher", self._batchers[model].stats, model=model)
+            metrics.register_stats("llm_model", stats.stats, model=model)
+
+    def ask(self, prompt: str, on_partial=None):
+        # on_partial(intent) is called from the LLM thread each time a streamed
+        # field completes, so callers can use genre/author before the reply ends
+        with metrics.span("intent") as span:
+            with metrics.span("intent.cache"):
+                cached = self.cache.get(prompt)
+            if cached is not None:
+                span["path"] = self._record_path("cache")
+                return cached
+
+            with metrics.span("intent.rules"):
+                intent, confidence = extract_intent(prompt)
+            if confidence >= LOCAL_INTENT_CONFIDENCE:
+                span["path"] = self._record_path("local")
+                return intent
+
+            if not llm_breaker.allow():
+                # The LLM has been timing out; answer with the local guess until the cooldown ends
+                span["path"] = self._record_path("bypass")
+                return intent
+
+            span["path"] = self._record_path("llm")
+            return dict(llm_flight.do(normalize_prompt(prompt), self._ask_llm, prompt, on_partial))
+
+    def _ask_llm(self, prompt: str, on_partial=None):
+        model = self.router.route(prompt)
+        try:
+            result, complete = self._batchers[model].submit((prompt, on_partial)).result(timeout=LLM_WAIT)
+            escalation = self.router.escalation(model)
+            if not complete and escalation is not None:
+                # The small model's reply didn't parse into a full intent: ask the large one.
+                # An empty intent that did parse is an answer (e.g. a bare title).
+                self.router.models[model].record_escalations(1)
+                metrics.incr("llm_escalations_total", model=model)
+                result, complete = self._batchers[escalation].submit((prompt, on_partial)).result(timeout=LLM_WAIT)
+        except RateLimited:
+            llm_breaker.record_abandoned()
+            # Best local guess rather than an empty intent; not memoized
+            return extract_intent(prompt)[0]
+        except Exception:
+            # A failed request has already been recorded; this covers a trial that never got sent
+            llm_breaker.record_abandoned()
+            raise
+        # Don't memoize a reply that didn't parse so a transient bad one isn't sticky
+        if complete:
+            self.cache.set(prompt, result)
+        return result
+
+    @property
+    def client(self):
+        return self._client.get()
+
+    def _build_client(self):
+        import groq
+        # No SDK retries: the limiter and breaker must see every 429 and timeout,
+        # and one request must not outlast GROQ_TIMEOUT
+        return groq.Groq(api_key=self._api_key, base_url=GROQ_BASE_URL, timeout=GROQ_TIMEOUT, max_retries=0)
+
+    def _record_path(self, path):
+        with self._path_lock:
+            self.path_counts[path] += 1
+        metrics.incr("intent_requests_total", path=path)
+        return path
+
+    def _extract_intents(self, model, items, emit=None):
+        # items: [(prompt, on_partial)]; one streamed request for all of them.
+        # Each intent is emitted as soon as its last field is in, so an early
+        # prompt in a batch doesn't wait for the rest of the reply.
+        if len(items) == 1:
+            messages = [
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": items[0][0]},
+            ]
+        else:
+            numbered = [{"id": i, "prompt": prompt} for i, (prompt, _) in enumerate(items)]
+            messages = [
+                {"role": "system", "content": BATCH_SYSTEM_PROMPT},
+                {"role": "user", "content": json.dumps(numbered)},
+            ]
+
+        import groq
+
+        parser = IntentStreamParser(count=len(items))
+        stats = self.router.models[model]
+        usage = {}
+        with llm_limiter.slot() as slot, metrics.span("llm.request", batch=len(items), model=model) as span:
+            started = time.perf_counter()
+            reply = self._complete(model, messages, LLM_MAX_TOKENS * len(items), usage)
+            try:
+                for content in reply:
+                    span.setdefault("first_token_ms", round((time.perf_counter() - started) * 1000, 1))
+                    for index in parser.feed(content):
+                        on_partial = items[index][1]
+                        if on_partial is not None:
+                            on_partial(parser.result(index))
+                        if emit is not None and len(parser.found[index]) == len(parser.fields):
+                            emit(index, (parser.result(index), True))
+                    if parser.done:
+                        # Every field is in; the closing brace and any trailing prose can't change it
+                        break
+            except groq.RateLimitError as exc:
+                stats.record_error()
+                llm_breaker.record_abandoned()
+                metrics.incr("upstream_requests_total", upstream=llm_limiter.name, status=429)
+                slot.throttled(exc.response.headers.get("retry-after"))
+                raise RateLimited(llm_limiter.name, slot.retry_after) from exc
+            except Exception:
+                stats.record_error()
+                llm_breaker.record_failure()
+                metrics.incr("upstream_requests_total", upstream=llm_limiter.name, status="error")
+                raise
+            finally:
+                reply.close()
+            elapsed = time.perf_counter() - started
+        metrics.incr("upstream_requests_total", upstream=llm_limiter.name, status=200)
+        # Only the request itself counts against the budget, not the limiter
+        # queue, the batch window or an escalation
+        if elapsed > LLM_BUDGET:
+            llm_breaker.record_failure()
+        else:
+            llm_breaker.record_success()
+
+        if not parser.done:
+            parser.finish()
+        # (intent, complete): an intent missing fields was cut off or malformed
+        results = [
+            (parser.result(index), len(parser.found[index]) == len(parser.fields)) for index in range(len(items))
+        ]
+        failures = sum(not complete for _, complete in results)
+        if failures:
+            metrics.incr("llm_parse_failures_total", failures, model=model)
+        # A stream closed early never reaches the usage chunk; estimate at ~4
+        # characters per token, and one token per streamed chunk
+        prompt_tokens = usage.get("prompt_tokens", sum(len(message["content"]) for message in messages) // 4)
+        completion_tokens = usage.get("completion_tokens", usage.get("chunks", 0))
+        metrics.incr("llm_tokens_total", prompt_tokens, model=model, kind="prompt")
+        metrics.incr("llm_tokens_total", completion_tokens, model=model, kind="completion")
+        stats.record(elapsed, len(items), failures, prompt_tokens, completion_tokens)
+        return results
+
+    def _complete(self, model, messages, max_tokens, usage):
+        # Yields the reply as it streams in, in JSON mode with a tight token
+        # cap. A model that won't stream in JSON mode is asked without
+        # streaming from then on and its reply is yielded whole.
+        import groq
+
+        request = dict(
+            model=model, messages=messages, max_tokens=max_tokens, response_format={"type": "json_object"},
+        )
+        if model not in self._unstreamable:
+            try:
+                stream = self.client.chat.completions.create(stream=True, **request)
+            except groq.BadRequestError as exc:
+                # Anything else (an unknown model, an over-long prompt) would fail unstreamed too
+                if not _rejects_streaming(exc):
+                    raise
+                self._unstreamable.add(model)
+            else:
+                try:
+                    for chunk in stream:
+                        # Groq reports usage on the last chunk, under x_groq
+                        x_groq = getattr(chunk, "x_groq", None)
+                        _read_usage(getattr(chunk, "usage", None) or getattr(x_groq, "usage", None), usage)
+                        content = chunk.choices[0].delta.content if chunk.choices else None
+                        if content:
+                            usage["chunks"] = usage.get("chunks", 0) + 1
+                            yield content
+                finally:
+                    stream.close()
+                return
+        response = self.client.chat.completions.create(**request)
+        _read_usage(response.usage, usage)
+        yield response.choices[0].message.content or ""
+
+
+def _rejects_streaming(exc):
+    message = str(exc).lower()
+    return "stream" in message or "response_format" in message
+
+
+def _read_usage(reported, usage):
+    if reported is not None:
+        usage["prompt_tokens"] = reported.prompt_tokens
+        usage["completion_tokens"] = reported.completion_tokens
+
+_agent = Resource(Agent)
+
+
+def get_agent():
+    return _agent.get()
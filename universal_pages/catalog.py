@@ -0,0 +1,191 @@
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+from .book import Book
+from .trigram import TrigramIndex
+from .vectors import TfidfMatrix
+
+_TOKEN = re.compile(r"\w+")
+
+STOPWORDS = {"a", "an", "the", "of", "and", "or", "in", "on", "to", "for", "by", "with", "is"}
+
+# Book values that carry no searchable text
+_PLACEHOLDERS = {"N/A", "No description available."}
+
+FIELD_WEIGHTS = {"title": 3.0, "author": 2.0, "genre": 1.5, "description": 1.0}
+
+# Term weights for the TF-IDF vectors behind "more like this": what a book is about, not who wrote it
+VECTOR_WEIGHTS = {"genre": 2.0, "description": 1.0}
+
+
+def tokenize(text):
+    return [t for t in _TOKEN.findall(text.lower()) if t not in STOPWORDS]
+
+
+def volume_key(book):
+    return book.id or f"{book.title}|{book.author}".lower()
+
+
+class Catalog:
+    # Every volume we have fetched, with an incremental BM25 inverted index over
+    # title, authors, categories and description. Volumes persist in SQLite and
+    # the index is rebuilt from them on startup, along with which volumes each
+    # query returned so a query seen before can be answered without the API.
+
+    def __init__(self, path=None, k1=1.2, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self._books = []
+        self._keys = {}
+        self._queries = {}
+        self._postings = {}
+        self._lengths = []
+        self._total_length = 0.0
+        self._fuzzy = TrigramIndex()
+        self._vectors = TfidfMatrix(os.path.splitext(path)[0] + ".tfidf" if path else None)
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            self._open(path)
+
+    def __len__(self):
+        return len(self._books)
+
+    def __iter__(self):
+        return iter(list(self._books))
+
+    def get(self, key):
+        doc = self._keys.get(key)
+        return None if doc is None else self._books[doc]
+
+    def add_many(self, books, query=None):
+        # query: the normalized query the API returned `books` for, if any
+        added = []
+        with self._lock:
+            for book in books:
+                key = volume_key(book)
+                if key not in self._keys:
+                    self._index(key, book)
+                    added.append((key, json.dumps(book)))
+            if query is not None:
+                self._queries[query] = ([volume_key(book) for book in books], time.time())
+            if self._db is not None and (added or query is not None):
+                self._db.executemany("INSERT OR IGNORE INTO volumes (key, data) VALUES (?, ?)", added)
+                if query is not None:
+                    keys, fetched_at = self._queries[query]
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO queries (query, keys, fetched_at) VALUES (?, ?, ?)",
+                        (query, json.dumps(keys), fetched_at),
+                    )
+                self._db.commit()
+        return len(added)
+
+    def results_for(self, query):
+        # (books, fetched_at): what the API last returned for this normalized
+        # query, in its order, and when; None if it was never fetched
+        with self._lock:
+            entry = self._queries.get(query)
+            if entry is None:
+                return None
+            keys, fetched_at = entry
+            return [self._books[self._keys[key]] for key in keys if key in self._keys], fetched_at
+
+    def search(self, query, limit=5):
+        # BM25 over volumes containing any of the query terms
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+        with self._lock:
+            scores = Counter()
+            n_docs = len(self._books)
+            avg_length = self._total_length / n_docs if n_docs else 0.0
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc, tf in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._lengths[doc] / avg_length)
+                    scores[doc] += idf * tf * (self.k1 + 1) / (tf + norm)
+            return [self._books[doc] for doc, _ in scores.most_common(limit)]
+
+    def similar(self, key, limit=5):
+        # "More like this": nearest volumes by TF-IDF cosine over categories and description
+        doc = self._keys.get(key)
+        if doc is None:
+            return []
+        return [self._books[row] for row, _ in self._vectors.similar(doc, limit)]
+
+    def relevance(self, query, books):
+        # TF-IDF cosine between the query and each book (0.0 for books not in the catalog)
+        docs = [self._keys.get(volume_key(book)) for book in books]
+        known = [doc for doc in docs if doc is not None]
+        if not known:
+            return [0.0] * len(books)
+        scores = iter(self._vectors.scores(Counter(tokenize(query)), known).tolist())
+        return [0.0 if doc is None else next(scores) for doc in docs]
+
+    def fuzzy_search(self, query, limit=5, cutoff=85):
+        # Typo-tolerant title/author lookup, e.g. "harry poter" or "agata christie"
+        docs = []
+        for _, _, payloads in self._fuzzy.search(query, limit=limit, cutoff=cutoff):
+            docs.extend(doc for doc in payloads if doc not in docs)
+        return [self._books[doc] for doc in docs[:limit]]
+
+    def _index(self, key, book, vectorize=True):
+        doc = len(self._books)
+        self._books.append(book)
+        self._keys[key] = doc
+        weighted = Counter()
+        for field, weight in FIELD_WEIGHTS.items():
+            value = getattr(book, field)
+            if value in _PLACEHOLDERS:
+                continue
+            for token in tokenize(value):
+                weighted[token] += weight
+        for token, tf in weighted.items():
+            self._postings.setdefault(token, {})[doc] = tf
+        length = sum(weighted.values())
+        self._lengths.append(length)
+        self._total_length += length
+        if book.title not in _PLACEHOLDERS:
+            self._fuzzy.add(book.title, doc)
+        for author in book.author.split(", "):
+            if author and author not in _PLACEHOLDERS:
+                self._fuzzy.add(author, doc)
+        if vectorize:
+            terms = Counter()
+            for field, weight in VECTOR_WEIGHTS.items():
+                value = getattr(book, field)
+                if value not in _PLACEHOLDERS:
+                    for token in tokenize(value):
+                        terms[token] += weight
+            self._vectors.add(key, terms)
+
+    def _open(self, path):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS volumes (key TEXT PRIMARY KEY, data TEXT NOT NULL)")
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(queries)")}
+        if columns and "fetched_at" not in columns:
+            # Queries recorded before fetch times were kept can't be dated; they are fetched again
+            self._db.execute("DROP TABLE queries")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS queries (query TEXT PRIMARY KEY, keys TEXT NOT NULL, fetched_at REAL NOT NULL)"
+        )
+        self._db.commit()
+        self._queries = {
+            query: (json.loads(keys), fetched_at)
+            for query, keys, fetched_at in self._db.execute("SELECT query, keys, fetched_at FROM queries")
+        }
+        rows = self._db.execute("SELECT key, data FROM volumes ORDER BY rowid").fetchall()
+        # Rows already in the saved TF-IDF matrix are mapped rather than re-tokenized
+        restored = self._vectors.load([key for key, _ in rows])
+        for doc, (key, data) in enumerate(rows):
+            self._index(key, Book.load(json.loads(data)), vectorize=doc >= restored)
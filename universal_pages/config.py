@@ -0,0 +1,94 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv(dotenv_path='api.env')
+
+# Overall deadline (seconds) for a single search across all upstream calls
+SEARCH_TIMEOUT = float(os.getenv("SEARCH_TIMEOUT", "15"))
+
+# Slice of the search deadline the LLM gets before results render without it
+LLM_BUDGET = float(os.getenv("LLM_BUDGET", "2"))
+# Intent prompts arriving within this window (up to LLM_BATCH_MAX) go to Groq as one request; 0 disables
+LLM_BATCH_WINDOW_MS = float(os.getenv("LLM_BATCH_WINDOW_MS", "20"))
+LLM_BATCH_MAX = int(os.getenv("LLM_BATCH_MAX", "8"))
+# Prompts of at most LLM_FAST_MAX_WORDS words go to the small model; intents it returns
+# unparseable or incomplete are retried on the large one. An empty LLM_FAST_MODEL disables routing.
+LLM_MODEL = os.getenv("LLM_MODEL", "meta-llama/llama-4-maverick-17b-128e-instruct")
+LLM_FAST_MODEL = os.getenv("LLM_FAST_MODEL", "llama-3.1-8b-instant")
+LLM_FAST_MAX_WORDS = int(os.getenv("LLM_FAST_MAX_WORDS", "12"))
+# Completion tokens allowed per intent in a request (one intent object is ~30)
+LLM_MAX_TOKENS = int(os.getenv("LLM_MAX_TOKENS", "60"))
+# Hard timeout for a Groq request that keeps running in the background
+GROQ_TIMEOUT = float(os.getenv("GROQ_TIMEOUT", "20"))
+# Override to point the Groq client at another OpenAI-compatible server (e.g. bench stubs)
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL") or None
+# Consecutive slow/failed LLM calls that open the breaker, and how long it stays open (s)
+LLM_BREAKER_THRESHOLD = int(os.getenv("LLM_BREAKER_THRESHOLD", "3"))
+LLM_BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "60"))
+
+GOOGLE_BOOKS_URL = os.getenv("GOOGLE_BOOKS_URL", "https://www.googleapis.com/books/v1/volumes")
+
+# Shared HTTP pool used for all Google Books requests
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "16"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3.05"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "10"))
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "3"))
+
+# Local result cache (in-memory LRU backed by SQLite)
+CACHE_DIR = os.getenv("CACHE_DIR", ".cache")
+BOOK_CACHE_TTL = float(os.getenv("BOOK_CACHE_TTL", str(24 * 60 * 60)))
+# How long past its TTL a result is still served (marked as cached) while it refreshes
+BOOK_CACHE_STALE_TTL = float(os.getenv("BOOK_CACHE_STALE_TTL", str(7 * 24 * 60 * 60)))
+BOOK_CACHE_MEMORY_ENTRIES = int(os.getenv("BOOK_CACHE_MEMORY_ENTRIES", "256"))
+BOOK_CACHE_DISK_ENTRIES = int(os.getenv("BOOK_CACHE_DISK_ENTRIES", "10000"))
+
+# Memoized Agent.ask results; threshold is a fuzzywuzzy score (0-100)
+INTENT_CACHE_SIZE = int(os.getenv("INTENT_CACHE_SIZE", "512"))
+INTENT_CACHE_THRESHOLD = int(os.getenv("INTENT_CACHE_THRESHOLD", "90"))
+INTENT_CACHE_PERSIST = os.getenv("INTENT_CACHE_PERSIST", "1") == "1"
+
+# Minimum share of query tokens the rule-based extractor must explain to skip the LLM
+LOCAL_INTENT_CONFIDENCE = float(os.getenv("LOCAL_INTENT_CONFIDENCE", "0.8"))
+
+# Minimum fuzzywuzzy ratio (0-100) for a typo-tolerant title/author match
+FUZZY_MATCH_CUTOFF = int(os.getenv("FUZZY_MATCH_CUTOFF", "85"))
+
+# Pages of 40 results fetched in parallel per "load more" click
+LOAD_MORE_PAGES = int(os.getenv("LOAD_MORE_PAGES", "2"))
+
+# Fan a search out into inauthor:/subject:/intitle: sub-queries once the intent is known
+QUERY_FANOUT = os.getenv("QUERY_FANOUT", "1") == "1"
+
+# Cold import of the search core, and a rerun that doesn't call any upstream
+STARTUP_BUDGET_MS = float(os.getenv("STARTUP_BUDGET_MS", "250"))
+RERUN_BUDGET_MS = float(os.getenv("RERUN_BUDGET_MS", "50"))
+
+# Local server for cacheable static assets (and /metrics). Pages only link to it
+# when ASSET_PUBLIC_URL says where browsers can reach it; otherwise CSS is inlined.
+ASSET_SERVER_ENABLED = os.getenv("ASSET_SERVER_ENABLED", "1") == "1"
+ASSET_HOST = os.getenv("ASSET_HOST", "127.0.0.1")
+ASSET_PORT = int(os.getenv("ASSET_PORT", "8765"))
+ASSET_PUBLIC_URL = os.getenv("ASSET_PUBLIC_URL", "")
+
+# Show the latest search's per-stage timing waterfall under the results
+DEBUG_PANEL = os.getenv("DEBUG_PANEL", "0") == "1"
+
+# Cover thumbnails proxied through the asset server and cached under CACHE_DIR/covers
+COVER_CACHE_MAX_MB = float(os.getenv("COVER_CACHE_MAX_MB", "200"))
+COVER_MAX_WIDTH = int(os.getenv("COVER_MAX_WIDTH", "240"))
+COVER_MAX_HEIGHT = int(os.getenv("COVER_MAX_HEIGHT", "320"))
+
+# Client-side quotas per upstream: requests/sec (0 = unlimited), burst, max concurrency, max queue wait (s)
+BOOKS_RATE_LIMIT = float(os.getenv("BOOKS_RATE_LIMIT", "10"))
+BOOKS_BURST = int(os.getenv("BOOKS_BURST", "20"))
+BOOKS_MAX_CONCURRENCY = int(os.getenv("BOOKS_MAX_CONCURRENCY", "8"))
+GROQ_RATE_LIMIT = float(os.getenv("GROQ_RATE_LIMIT", "0.5"))
+GROQ_BURST = int(os.getenv("GROQ_BURST", "5"))
+GROQ_MAX_CONCURRENCY = int(os.getenv("GROQ_MAX_CONCURRENCY", "4"))
+UPSTREAM_MAX_WAIT = float(os.getenv("UPSTREAM_MAX_WAIT", "5"))
+
+def get_api_key():
+    api_key = os.getenv("GROQ_API_KEY")
+    if not api_key:
+        raise ValueError("GROQ_API_KEY is missing in environment variables.")
+    return api_key
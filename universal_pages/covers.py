@@ -0,0 +1,192 @@
+import base64
+import hashlib
+import io
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+import requests
+from . import assets, http_client
+from .config import CACHE_DIR, COVER_CACHE_MAX_MB, COVER_MAX_WIDTH, COVER_MAX_HEIGHT
+from .resources import Resource
+
+logger = logging.getLogger(__name__)
+
+ROUTE = "/covers/"
+PLACEHOLDER_NAME = "placeholder.svg"
+CACHE_CONTROL = "public, max-age=2592000"
+
+_SAFE_ID = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+PLACEHOLDER_SVG = (
+    '<svg xmlns="http://www.w3.org/2000/svg" width="250" height="350" viewBox="0 0 250 350">'
+    '<defs><linearGradient id="g" x1="0" y1="0" x2="1" y2="1">'
+    '<stop offset="0" stop-color="#1A1429"/><stop offset="1" stop-color="#0D0A1A"/>'
+    '</linearGradient></defs>'
+    '<rect width="250" height="350" fill="url(#g)"/>'
+    '<rect x="12" y="12" width="226" height="326" fill="none" stroke="#7B2CBF" stroke-opacity=".5" rx="8"/>'
+    '<text x="125" y="180" fill="#ADB5BD" font-family="Montserrat, sans-serif" font-size="20" '
+    'text-anchor="middle">No Cover</text>'
+    '</svg>'
+).encode("utf-8")
+PLACEHOLDER_ETAG = '"%s"' % hashlib.sha256(PLACEHOLDER_SVG).hexdigest()[:16]
+PLACEHOLDER_DATA_URI = "data:image/svg+xml;base64," + base64.b64encode(PLACEHOLDER_SVG).decode("ascii")
+
+
+class CoverStore:
+    # Resized JPEG thumbnails on disk keyed by volume id, evicted least
+    # recently served first once the directory grows past max_bytes
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._sources = OrderedDict()
+        self._lock = threading.Lock()
+        self._fetch_locks = {}
+        os.makedirs(directory, exist_ok=True)
+        self._total = sum(
+            entry.stat().st_size for entry in os.scandir(directory) if entry.name.endswith(".jpg")
+        )
+
+    def remember(self, volume_id, source_url):
+        with self._lock:
+            self._sources[volume_id] = source_url
+            self._sources.move_to_end(volume_id)
+            while len(self._sources) > 10000:
+                self._sources.popitem(last=False)
+
+    def get(self, volume_id):
+        # Returns JPEG bytes, downloading and resizing on first request, or None
+        path = os.path.join(self.directory, volume_id + ".jpg")
+        data = self._read(path)
+        if data is not None:
+            return data
+        with self._lock:
+            fetch_lock = self._fetch_locks.setdefault(volume_id, threading.Lock())
+        with fetch_lock:
+            data = self._read(path)
+            if data is None:
+                data = self._download(volume_id)
+                if data is not None:
+                    self._write(path, data)
+        with self._lock:
+            self._fetch_locks.pop(volume_id, None)
+        return data
+
+    def _source(self, volume_id):
+        with self._lock:
+            url = self._sources.get(volume_id)
+        if url is None:
+            from .books_api import get_catalog
+            book = get_catalog().get(volume_id)
+            url = book.image_url if book else ""
+        return url
+
+    def _download(self, volume_id):
+        url = self._source(volume_id)
+        if not url:
+            return None
+        try:
+            response = http_client.get(url)
+        except requests.RequestException:
+            return None
+        if response.status_code != 200 or not response.content:
+            return None
+        return _shrink(response.content)
+
+    def _read(self, path):
+        try:
+            with open(path, "rb") as cover:
+                data = cover.read()
+        except OSError:
+            return None
+        # The access time is the LRU clock
+        os.utime(path, (time.time(), os.stat(path).st_mtime))
+        return data
+
+    def _write(self, path, data):
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as cover:
+            cover.write(data)
+        os.replace(tmp, path)
+        with self._lock:
+            self._total += len(data)
+            if self._total > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        entries = sorted(
+            (entry for entry in os.scandir(self.directory) if entry.name.endswith(".jpg")),
+            key=lambda entry: entry.stat().st_atime,
+        )
+        self._total = sum(entry.stat().st_size for entry in entries)
+        for entry in entries:
+            if self._total <= self.max_bytes * 0.9:
+                break
+            try:
+                size = entry.stat().st_size
+                os.remove(entry.path)
+                self._total -= size
+            except OSError:
+                pass
+
+
+def _shrink(data):
+    # Pillow ships with Streamlit; without it the original bytes are kept as-is
+    try:
+        from PIL import Image
+    except ImportError:
+        return data
+    try:
+        image = Image.open(io.BytesIO(data))
+        image = image.convert("RGB")
+        image.thumbnail((COVER_MAX_WIDTH, COVER_MAX_HEIGHT))
+        out = io.BytesIO()
+        image.save(out, "JPEG", quality=80, optimize=True, progressive=True)
+        return out.getvalue()
+    except Exception:
+        logger.debug("Could not re-encode cover", exc_info=True)
+        return data
+
+
+_store = Resource(lambda: CoverStore(
+    os.path.join(CACHE_DIR, "covers"), int(COVER_CACHE_MAX_MB * 1024 * 1024)
+))
+
+
+def _serve(name, headers):
+    if name == PLACEHOLDER_NAME:
+        return 200, "image/svg+xml", PLACEHOLDER_SVG, CACHE_CONTROL, PLACEHOLDER_ETAG
+    if not _SAFE_ID.match(name):
+        return 404, "text/plain", b"Not found", "no-store", None
+    data = _store.get().get(name)
+    if data is None:
+        # Short-lived so a cover that failed once is retried later
+        return 200, "image/svg+xml", PLACEHOLDER_SVG, "public, max-age=300", None
+    etag = '"%s"' % hashlib.sha256(data).hexdigest()[:16]
+    content_type = "image/png" if data[:4] == b"\x89PNG" else "image/jpeg"
+    return 200, content_type, data, CACHE_CONTROL, etag
+
+
+assets.add_route(ROUTE, _serve)
+
+
+def placeholder_url():
+    if assets.is_public():
+        return assets.url_for(ROUTE + PLACEHOLDER_NAME)
+    return PLACEHOLDER_DATA_URI
+
+
+def cover_url(book):
+    # Proxied, cached thumbnail when browsers can reach the asset server;
+    # otherwise the original Google URL, and a locally generated placeholder either way
+    image_url = book.image_url
+    volume_id = book.id
+    if not image_url:
+        return placeholder_url()
+    if not assets.is_public() or not _SAFE_ID.match(volume_id):
+        return image_url
+    _store.get().remember(volume_id, image_url)
+    return assets.url_for(ROUTE + volume_id)
@@ -0,0 +1,70 @@
+import random
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from .config import HTTP_POOL_SIZE, HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT, HTTP_MAX_RETRIES
+from . import metrics
+from .resources import Resource
+
+# 429 is left to the caller's UpstreamLimiter, which backs off for the whole
+# upstream; retrying it here would hide it and sleep inside the limiter slot
+RETRY_STATUSES = (500, 502, 503, 504)
+
+
+class JitteredRetry(Retry):
+    # Spread retries out so concurrent sessions don't hammer the upstream in lockstep
+    def get_backoff_time(self):
+        backoff = super().get_backoff_time()
+        if backoff <= 0:
+            return 0
+        return random.uniform(backoff / 2, backoff * 1.5)
+
+
+def _build_session():
+    retry = JitteredRetry(
+        total=HTTP_MAX_RETRIES,
+        backoff_factor=0.3,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset({"GET", "HEAD"}),
+        # An uncapped Retry-After sleep would hold the slot past the limiter's bounded wait
+        respect_retry_after_header=False,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=HTTP_POOL_SIZE,
+        pool_maxsize=HTTP_POOL_SIZE,
+        pool_block=True,
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({
+        "Accept": "application/json",
+        "Accept-Encoding": "gzip, deflate",
+        "Connection": "keep-alive",
+        "User-Agent": "UniversalPages/1.0 (gzip)",
+    })
+    return session
+
+
+# Every rerun and every session shares the same pool of warm connections
+_session = Resource(_build_session)
+
+
+def get_session():
+    return _session.get()
+
+
+def get(url, params=None, timeout=None, **kwargs):
+    if timeout is None:
+        timeout = (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+    response = get_session().get(url, params=params, timeout=timeout, **kwargs)
+    # urllib3 retried transparently; surface how often so flaky upstreams are visible
+    retries = getattr(response.raw, "retries", None)
+    retried = len(retries.history) if retries is not None else 0
+    if retried:
+        metrics.incr("http_retries_total", retried, host=urlsplit(url).hostname)
+    metrics.annotate(status=response.status_code, retries=retried)
+    return response
@@ -0,0 +1,113 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+
+
+def normalize_prompt(prompt):
+    return " ".join(_PUNCTUATION.sub(" ", prompt.lower()).split())
+
+
+def _same_slots(prompt, other):
+    # "horror novels by stephen king" scores 91 against "humor novels by
+    # stephen king"; a near match only counts if the rules read the same
+    # genre, author and length in both
+    from .intent_rules import extract_intent
+    return extract_intent(prompt)[0] == extract_intent(other)[0]
+
+
+class IntentCache:
+    # LRU memo for Agent.ask results. Lookups try the normalized prompt first
+    # and then the closest cached prompt scoring at least `threshold` (0-100)
+    # that doesn't differ from it in a genre, author or length word. Only the
+    # few cached prompts sharing the most trigrams with it are scored, outside
+    # the lock.
+
+    def __init__(self, max_entries=512, threshold=90, path=None):
+        from .trigram import TrigramIndex
+
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self._entries = OrderedDict()
+        self._index = TrigramIndex()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "fuzzy_hits": 0, "misses": 0}
+        self._db = None
+        if path:
+            self._open(path)
+
+    def get(self, prompt):
+        key = normalize_prompt(prompt)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return dict(self._entries[key])
+            fuzzy = self.threshold < 100 and bool(self._entries)
+
+        match = None
+        if fuzzy:
+            from fuzzywuzzy import fuzz, process
+            candidates = [text for text, _ in self._index.shortlist(key)]
+            matches = process.extractBests(
+                key, candidates, scorer=fuzz.token_sort_ratio, score_cutoff=self.threshold, limit=5,
+            )
+            match = next((candidate for candidate in matches if _same_slots(key, candidate[0])), None)
+
+        with self._lock:
+            # The match may have been evicted while it was being scored
+            if match is None or match[0] not in self._entries:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(match[0])
+            self._stats["fuzzy_hits"] += 1
+            return dict(self._entries[match[0]])
+
+    def set(self, prompt, intent):
+        key = normalize_prompt(prompt)
+        with self._lock:
+            self._remember(key, dict(intent))
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO intents (key, value, updated_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(intent), time.time()),
+                )
+                self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        return stats
+
+    def _remember(self, key, intent):
+        if key not in self._entries:
+            self._index.add(key, None)
+        self._entries[key] = intent
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            evicted, _ = self._entries.popitem(last=False)
+            self._index.discard(evicted)
+
+    def _open(self, path):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS intents ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._db.commit()
+        # Warm the LRU with the most recently stored prompts, oldest first
+        rows = self._db.execute(
+            "SELECT key, value FROM (SELECT * FROM intents ORDER BY updated_at DESC LIMIT ?) "
+            "ORDER BY updated_at",
+            (self.max_entries,),
+        ).fetchall()
+        for key, value in rows:
+            self._remember(key, json.loads(value))
@@ -0,0 +1,131 @@
+import threading
+from .intent_cache import normalize_prompt
+
+GENRES = {
+    "mystery": "mystery", "mysteries": "mystery", "detective": "mystery", "whodunit": "mystery",
+    "crime": "crime", "noir": "crime",
+    "thriller": "thriller", "thrillers": "thriller", "suspense": "thriller",
+    "romance": "romance", "romantic": "romance", "love story": "romance",
+    "fantasy": "fantasy", "epic fantasy": "fantasy", "magic": "fantasy",
+    "science fiction": "science fiction", "sci fi": "science fiction", "scifi": "science fiction",
+    "dystopian": "dystopian", "dystopia": "dystopian",
+    "horror": "horror", "ghost": "horror", "ghost stories": "horror",
+    "historical fiction": "historical fiction", "history": "history",
+    "biography": "biography", "biographies": "biography", "memoir": "memoir", "memoirs": "memoir",
+    "autobiography": "biography",
+    "self help": "self-help", "selfhelp": "self-help", "productivity": "self-help",
+    "poetry": "poetry", "poems": "poetry",
+    "philosophy": "philosophy", "psychology": "psychology",
+    "business": "business", "economics": "economics", "finance": "business",
+    "science": "science", "physics": "science", "quantum": "science",
+    "adventure": "adventure", "young adult": "young adult", "ya": "young adult",
+    "children": "children", "kids": "children", "classic": "classics", "classics": "classics",
+    "comics": "comics", "graphic novel": "comics", "manga": "comics",
+    "cookbook": "cooking", "cooking": "cooking", "travel": "travel",
+}
+
+LENGTHS = {
+    "short": "short", "quick read": "short", "quick": "short", "novella": "short",
+    "novellas": "short", "short stories": "short", "brief": "short",
+    "medium": "medium", "average length": "medium",
+    "long": "long", "lengthy": "long", "epic": "long", "doorstopper": "long", "saga": "long",
+}
+
+# Filler words that don't change the intent; they count as "explained"
+FILLER = {
+    "a", "an", "the", "by", "of", "on", "about", "and", "or", "for", "from", "with", "in",
+    "book", "books", "novel", "novels", "read", "reads", "story", "stories", "series",
+    "some", "any", "good", "best", "great", "top", "new", "popular", "recommend",
+    "recommendations", "i", "me", "my", "want", "like", "looking", "find", "show", "give",
+    "written", "author", "authors", "genre", "please", "something",
+}
+
+MAX_NGRAM = 4
+
+
+class Gazetteer:
+    # Author names and titles seen in earlier Google Books responses
+
+    def __init__(self):
+        self._authors = {}
+        self._titles = set()
+        self._lock = threading.Lock()
+
+    def add_book(self, book):
+        authors = [a for a in book.author.split(", ") if a and a != "N/A"]
+        title = book.title
+        with self._lock:
+            for author in authors:
+                self._authors.setdefault(normalize_prompt(author), author)
+            if title and title != "N/A":
+                self._titles.add(normalize_prompt(title))
+
+    def author(self, normalized):
+        return self._authors.get(normalized)
+
+    def is_title(self, normalized):
+        return normalized in self._titles
+
+    def __len__(self):
+        return len(self._authors) + len(self._titles)
+
+
+gazetteer = Gazetteer()
+
+
+def _match_phrases(tokens, lookup):
+    # Greedy longest-first n-gram matching; returns (matches, covered token indexes)
+    matches, covered = [], set()
+    for size in range(min(MAX_NGRAM, len(tokens)), 0, -1):
+        for start in range(len(tokens) - size + 1):
+            span = range(start, start + size)
+            if covered.intersection(span):
+                continue
+            value = lookup(" ".join(tokens[start:start + size]))
+            if value:
+                matches.append(value)
+                covered.update(span)
+    return matches, covered
+
+
+def extract_intent(prompt, known=gazetteer):
+    # Returns (intent, confidence) where confidence is the share of query
+    # tokens accounted for by a genre, author, length or filler word
+    intent = {"genre": "", "author": "", "length": ""}
+    normalized = normalize_prompt(prompt)
+    tokens = normalized.split()
+    if not tokens:
+        return intent, 0.0
+
+    authors, author_tokens = _match_phrases(tokens, known.author)
+    genres, genre_tokens = _match_phrases(tokens, GENRES.get)
+    lengths, length_tokens = _match_phrases(tokens, LENGTHS.get)
+    if authors:
+        intent["author"] = authors[0]
+    if genres:
+        intent["genre"] = genres[0]
+    if lengths:
+        intent["length"] = lengths[0]
+
+    # A bare title has no genre/author to extract; the empty intent is the answer
+    if not any(intent.values()) and known.is_title(normalized):
+        return intent, 1.0
+
+    explained = author_tokens | genre_tokens | length_tokens
+    explained.update(i for i, token in enumerate(tokens) if token in FILLER)
+    if not (authors or genres or lengths):
+        return intent, 0.0
+    return intent, len(explained) / len(tokens)
+
+
+def residual_terms(prompt, intent):
+    # Query tokens left once the intent's author, genre and length phrases and
+    # filler words are taken out, e.g. "dune" from "long sci fi like dune"
+    tokens = normalize_prompt(prompt).split()
+    author = set(normalize_prompt(intent.get("author", "")).split())
+    _, genre_tokens = _match_phrases(tokens, GENRES.get)
+    _, length_tokens = _match_phrases(tokens, LENGTHS.get)
+    return [
+        token for i, token in enumerate(tokens)
+        if token not in author and token not in FILLER and i not in genre_tokens and i not in length_tokens
+    ]
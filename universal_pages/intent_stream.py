@@ -0,0 +1,76 @@
+import json
+import re
+
+INTENT_FIELDS = ("genre", "author", "length")
+
+# A "key": value pair whose value is complete: a string once its closing quote
+# has arrived (escapes are kept for json.loads), null, or an integer (batch ids)
+_PAIR = re.compile(r'"(\w+)"\s*:\s*("(?:[^"\\]|\\.)*"|null|-?\d+(?=\s*[,}\]]))')
+
+
+class IntentStreamParser:
+    # Fed the chat completion as it streams in; reports each intent field as
+    # soon as its string value is complete instead of waiting for the whole
+    # reply. Tolerates code fences or prose around the JSON. With count > 1
+    # the reply is an array of intents, each introduced by its "id".
+
+    def __init__(self, count=1, fields=INTENT_FIELDS):
+        self.count = count
+        self.fields = fields
+        self.intents = [{field: "" for field in fields} for _ in range(count)]
+        self.found = [set() for _ in range(count)]
+        self._current = 0
+        self._buffer = ""
+        self._pos = 0
+
+    def feed(self, chunk):
+        # Returns the indexes of the intents that gained a field from this chunk
+        self._buffer += chunk
+        changed = set()
+        for match in _PAIR.finditer(self._buffer, self._pos):
+            self._pos = match.end()
+            key, value = match.group(1), json.loads(match.group(2))
+            if key == "id" and self.count > 1:
+                if isinstance(value, int) and 0 <= value < self.count:
+                    self._current = value
+            elif self._set(self._current, key, value):
+                changed.add(self._current)
+        return sorted(changed)
+
+    def finish(self):
+        # Fills anything the incremental pass missed (e.g. intents without an
+        # "id") from the complete reply, if it parses
+        start = min((i for i in (self._buffer.find("["), self._buffer.find("{")) if i >= 0), default=-1)
+        end = max(self._buffer.rfind("]"), self._buffer.rfind("}"))
+        if start < 0 or end < start:
+            return
+        try:
+            parsed = json.loads(self._buffer[start:end + 1])
+        except ValueError:
+            return
+        if isinstance(parsed, dict):
+            nested = [value for value in parsed.values() if isinstance(value, list)]
+            parsed = nested[0] if nested and self.count > 1 else [parsed]
+        if not isinstance(parsed, list):
+            return
+        for position, intent in enumerate(parsed):
+            if not isinstance(intent, dict):
+                continue
+            index = intent.get("id", position) if self.count > 1 else position
+            if isinstance(index, int) and 0 <= index < self.count:
+                for key, value in intent.items():
+                    self._set(index, key, value)
+
+    @property
+    def done(self):
+        return all(len(found) == len(self.fields) for found in self.found)
+
+    def result(self, index=0):
+        return dict(self.intents[index])
+
+    def _set(self, index, key, value):
+        if key not in self.intents[index] or key in self.found[index]:
+            return False
+        self.intents[index][key] = value if isinstance(value, str) else ""
+        self.found[index].add(key)
+        return True
@@ -0,0 +1,174 @@
+import contextvars
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from . import assets
+
+PREFIX = "universal_pages"
+ROUTE = "/metrics"
+
+# Upper bounds (seconds) of the per-stage latency histogram
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_lock = threading.Lock()
+_counters = {}
+_histograms = {}
+_sources = []
+
+_trace = contextvars.ContextVar("trace", default=None)
+_span = contextvars.ContextVar("span", default=None)
+
+
+class Trace:
+    # Collects the spans of one rerun (including those from worker threads
+    # started with bind()) so the UI can draw them as a waterfall
+
+    def __init__(self, name):
+        self.name = name
+        self.started = time.perf_counter()
+        self.duration_ms = None
+        self.spans = []
+        self._token = None
+
+    def add(self, name, started, duration, attrs):
+        # Spans from background work that outlives the rerun are dropped
+        if self.duration_ms is None:
+            self.spans.append({
+                "name": name,
+                "start_ms": (started - self.started) * 1000,
+                "duration_ms": duration * 1000,
+                "attrs": attrs,
+            })
+
+    def finish(self):
+        if self.duration_ms is None:
+            self.duration_ms = (time.perf_counter() - self.started) * 1000
+            self.spans.sort(key=lambda span: span["start_ms"])
+        if self._token is not None:
+            _trace.reset(self._token)
+            self._token = None
+        return self
+
+
+def start_trace(name):
+    trace = Trace(name)
+    trace._token = _trace.set(trace)
+    return trace
+
+
+def bind(fn):
+    # Runs fn in a copy of the caller's context so its spans join the caller's trace
+    return functools.partial(contextvars.copy_context().run, fn)
+
+
+@contextmanager
+def span(name, **attrs):
+    # Times a stage into the stage histogram and, when a trace is active, the waterfall
+    token = _span.set(attrs)
+    started = time.perf_counter()
+    try:
+        yield attrs
+    finally:
+        _span.reset(token)
+        record(name, started, time.perf_counter() - started, **attrs)
+
+
+def record(name, started, duration, **attrs):
+    # For stages that don't fit a with-block, e.g. time to first result;
+    # `started` is a time.perf_counter() value
+    observe(name, duration)
+    trace = _trace.get()
+    if trace is not None:
+        trace.add(name, started, duration, attrs)
+
+
+def annotate(**attrs):
+    # Adds attributes (cache result, retry count, ...) to the innermost open span
+    current = _span.get()
+    if current is not None:
+        current.update(attrs)
+
+
+def incr(name, amount=1, **labels):
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+def observe(stage, seconds):
+    with _lock:
+        histogram = _histograms.get(stage)
+        if histogram is None:
+            histogram = _histograms[stage] = [0] * len(BUCKETS) + [0, 0.0]
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                histogram[i] += 1
+        histogram[-2] += 1
+        histogram[-1] += seconds
+
+
+def register_stats(name, stats, **labels):
+    # stats() returns a dict such as SingleFlight.stats(); numbers become
+    # gauges and strings (breaker state) become an info-style label
+    with _lock:
+        _sources.append((name, stats, labels))
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    escaped = (
+        '%s="%s"' % (key, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for key, value in labels
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(int(value))
+
+
+def prometheus_text():
+    with _lock:
+        counters = sorted(_counters.items())
+        histograms = sorted((stage, list(values)) for stage, values in _histograms.items())
+        sources = list(_sources)
+
+    lines = []
+    typed = set()
+    for (name, labels), value in counters:
+        metric = f"{PREFIX}_{name}"
+        if metric not in typed:
+            typed.add(metric)
+            lines.append(f"# TYPE {metric} counter")
+        lines.append(f"{metric}{_labels(labels)} {_number(value)}")
+
+    metric = f"{PREFIX}_stage_seconds"
+    if histograms:
+        lines.append(f"# TYPE {metric} histogram")
+    for stage, values in histograms:
+        for bound, count in zip(BUCKETS, values):
+            lines.append(f"{metric}_bucket{_labels([('stage', stage), ('le', bound)])} {count}")
+        lines.append(f"{metric}_bucket{_labels([('stage', stage), ('le', '+Inf')])} {values[-2]}")
+        lines.append(f"{metric}_sum{_labels([('stage', stage)])} {values[-1]!r}")
+        lines.append(f"{metric}_count{_labels([('stage', stage)])} {values[-2]}")
+
+    for name, stats, labels in sources:
+        for key, value in stats().items():
+            metric = f"{PREFIX}_{name}_{key}"
+            if isinstance(value, str):
+                lines.append(f"{metric}{_labels(sorted(labels.items()) + [(key, value)])} 1")
+            elif isinstance(value, (int, float)):
+                lines.append(f"{metric}{_labels(sorted(labels.items()))} {_number(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def _serve(path, headers):
+    if path not in ("", "/"):
+        return 404, "text/plain", b"Not found", "no-store", None
+    body = prometheus_text().encode("utf-8")
+    return 200, "text/plain; version=0.0.4; charset=utf-8", body, "no-store", None
+
+
+assets.add_route(ROUTE, _serve)
@@ -0,0 +1,87 @@
+import contextvars
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+
+class MicroBatcher:
+    # Groups calls that arrive within `window` seconds of the first one (or
+    # as soon as `max_size` are waiting) into a single fn(items, emit) call,
+    # which returns one result per item and may hand a result out early with
+    # emit(index, result). Each caller gets a Future for its own result; an
+    # exception from fn fails whatever the batch hasn't emitted yet. The batch
+    # runs in the context of its first caller so its spans land in that trace.
+
+    def __init__(self, fn, window=0.02, max_size=8, max_workers=4, name="batch"):
+        self.fn = fn
+        self.window = window
+        self.max_size = max(1, max_size)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._pending = []
+        self._generation = 0
+        self._timer = None
+        self._lock = threading.Lock()
+        self._stats = {"items": 0, "batches": 0, "largest": 0}
+
+    def submit(self, item):
+        future = Future()
+        with self._lock:
+            self._pending.append((item, future, contextvars.copy_context()))
+            self._stats["items"] += 1
+            if len(self._pending) >= self.max_size or self.window <= 0:
+                self._dispatch()
+            elif self._timer is None:
+                self._start_timer()
+        return future
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["pending"] = len(self._pending)
+        return stats
+
+    def _start_timer(self):
+        # The generation lets a timer that fired during a dispatch see it is stale
+        self._generation += 1
+        self._timer = threading.Timer(self.window, self._expire, args=(self._generation,))
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _expire(self, generation):
+        with self._lock:
+            if generation == self._generation and self._pending:
+                self._dispatch()
+
+    def _dispatch(self):
+        # Called with the lock held
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._generation += 1
+        batch, self._pending = self._pending[:self.max_size], self._pending[self.max_size:]
+        if self._pending:
+            self._start_timer()
+        self._stats["batches"] += 1
+        self._stats["largest"] = max(self._stats["largest"], len(batch))
+        try:
+            self._executor.submit(batch[0][2].run, self._run, batch)
+        except RuntimeError as exc:
+            # Shut down (e.g. at interpreter exit): fail the batch rather than leave its callers waiting
+            for _, future, _ in batch:
+                future.set_exception(exc)
+
+    def _run(self, batch):
+        futures = [future for _, future, _ in batch]
+
+        def emit(index, result):
+            if not futures[index].done():
+                futures[index].set_result(result)
+
+        try:
+            results = self.fn([item for item, _, _ in batch], emit)
+        except BaseException as exc:
+            for future in futures:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        for index, result in enumerate(results):
+            emit(index, result)
@@ -0,0 +1,77 @@
+from .catalog import volume_key
+from .intent_cache import normalize_prompt
+from .intent_rules import residual_terms
+
+# Reciprocal-rank fusion constant: higher flattens the gap between ranks
+RRF_K = 10
+
+# Sub-query weights in the merged ranking, relative to the raw query
+RAW_WEIGHT = 1.0
+AUTHOR_WEIGHT = 1.5
+SUBJECT_WEIGHT = 1.0
+TITLE_WEIGHT = 1.2
+
+# Added to a volume's fused score when its fields agree with the intent
+AUTHOR_MATCH_BOOST = 0.1
+GENRE_MATCH_BOOST = 0.05
+# Multiplies the TF-IDF cosine between the raw query and a volume's categories/description
+RELEVANCE_WEIGHT = 0.1
+
+
+def _quoted(value):
+    return '"%s"' % value.replace('"', "")
+
+
+def plan_queries(query, intent):
+    # Returns [(query, weight)], the raw query first. Without an author or a
+    # genre there is nothing to target and the raw query is the whole plan.
+    author = intent.get("author") or ""
+    genre = intent.get("genre") or ""
+    plan = [(query, RAW_WEIGHT)]
+    if not (author or genre):
+        return plan
+    rest = " ".join(residual_terms(query, intent))
+    if author:
+        plan.append((f"{rest} inauthor:{_quoted(author)}".strip(), AUTHOR_WEIGHT))
+    if genre:
+        scope = f" inauthor:{_quoted(author)}" if author else ""
+        plan.append((f"{rest} subject:{_quoted(genre)}{scope}".strip(), SUBJECT_WEIGHT))
+    if rest:
+        plan.append((f"intitle:{_quoted(rest)}", TITLE_WEIGHT))
+
+    seen, unique = set(), []
+    for sub_query, weight in plan:
+        if normalize_prompt(sub_query) not in seen:
+            seen.add(normalize_prompt(sub_query))
+            unique.append((sub_query, weight))
+    return unique
+
+
+def merge_ranked(results, intent, limit, query=""):
+    # results: [(weight, books)]. Volumes are deduplicated by id and by ISBN
+    # (the same edition under two ids) and ranked by weighted reciprocal rank
+    # summed over every list they appear in, plus a boost for matching fields
+    # and for how close the volume is to the query in the catalog's TF-IDF space.
+    author = normalize_prompt(intent.get("author") or "")
+    genre = (intent.get("genre") or "").lower()
+    scores, books, by_isbn = {}, {}, {}
+    for weight, ranked in results:
+        for rank, book in enumerate(ranked):
+            key = by_isbn.get(book.isbn) or volume_key(book)
+            if book.isbn:
+                by_isbn.setdefault(book.isbn, key)
+            if key not in books:
+                books[key] = book
+                scores[key] = 0.0
+                if author and author in normalize_prompt(book.author):
+                    scores[key] += AUTHOR_MATCH_BOOST
+                if genre and genre in book.genre.lower():
+                    scores[key] += GENRE_MATCH_BOOST
+            scores[key] += weight / (RRF_K + rank)
+    if query and books:
+        from .books_api import get_catalog
+        # One vectorized pass over every candidate
+        for key, relevance in zip(books, get_catalog().relevance(query, list(books.values()))):
+            scores[key] += RELEVANCE_WEIGHT * relevance
+    ranked_keys = sorted(books, key=lambda key: -scores[key])
+    return [books[key] for key in ranked_keys[:limit]]
@@ -0,0 +1,135 @@
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+
+
+class UpstreamUnavailable(Exception):
+    # The upstream failed or timed out and there was nothing local to answer with
+
+    def __init__(self, upstream, message=None):
+        super().__init__(message or f"{upstream} is unavailable")
+        self.upstream = upstream
+
+
+class RateLimited(UpstreamUnavailable):
+    # The upstream answered 429, or no slot freed up within the queue's max wait
+
+    def __init__(self, upstream, retry_after=None):
+        super().__init__(upstream, f"{upstream} is rate limiting requests")
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value):
+    # Retry-After is either delta-seconds or an HTTP date
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+
+    def take(self, now):
+        # Consumes a token and returns 0, or returns the seconds until one is
+        # available. A rate of 0 means unlimited, though a 429 still pauses it.
+        if now < self._paused_until:
+            return self._paused_until - now
+        if not self.rate:
+            return 0.0
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+    def pause(self, now, seconds):
+        self._tokens = 0.0
+        self._updated = now + seconds
+        self._paused_until = max(self._paused_until, now + seconds)
+
+
+class _Slot:
+    def __init__(self):
+        self.was_throttled = False
+        self.retry_after = None
+
+    def throttled(self, retry_after=None):
+        self.was_throttled = True
+        self.retry_after = parse_retry_after(retry_after) if isinstance(retry_after, str) else retry_after
+
+
+class UpstreamLimiter:
+    # Client-side quota for one upstream: a token bucket caps the request
+    # rate, and an AIMD window caps concurrency (grows by 1/limit per success,
+    # halves on a 429). Callers queue for at most max_wait seconds.
+
+    def __init__(self, name, rate, burst, max_concurrency, min_concurrency=1, max_wait=5.0):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.max_wait = max_wait
+        self._bucket = TokenBucket(rate, burst)
+        self._limit = float(max_concurrency)
+        self._in_flight = 0
+        self._cond = threading.Condition()
+        self._stats = {"granted": 0, "throttled": 0, "rejected": 0}
+
+    @contextmanager
+    def slot(self):
+        self._acquire()
+        slot = _Slot()
+        try:
+            yield slot
+        finally:
+            self._release(slot)
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats["limit"] = round(self._limit, 2)
+            stats["in_flight"] = self._in_flight
+        return stats
+
+    def _acquire(self):
+        deadline = time.monotonic() + self.max_wait
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                wait = None
+                if self._in_flight < int(self._limit):
+                    wait = self._bucket.take(now)
+                    if wait == 0:
+                        self._in_flight += 1
+                        self._stats["granted"] += 1
+                        return
+                remaining = deadline - now
+                if remaining <= 0:
+                    self._stats["rejected"] += 1
+                    raise RateLimited(self.name)
+                # Woken early by a release when waiting on concurrency
+                self._cond.wait(remaining if wait is None else min(wait, remaining))
+
+    def _release(self, slot):
+        with self._cond:
+            self._in_flight -= 1
+            if slot.was_throttled:
+                self._stats["throttled"] += 1
+                self._limit = max(self.min_concurrency, self._limit / 2)
+                self._bucket.pause(time.monotonic(), slot.retry_after or 1.0)
+            else:
+                self._limit = min(self.max_concurrency, self._limit + 1 / self._limit)
+            self._cond.notify_all()
@@ -0,0 +1,138 @@
+import html
+from string import Template
+from urllib.parse import quote
+from .catalog import volume_key
+from .covers import cover_url, placeholder_url
+
+DESCRIPTION_LIMIT = 320
+
+# Templates are compiled once at import. They stay on a single line per
+# element: Streamlit's markdown treats indented lines as code blocks and a
+# blank line ends an HTML block.
+_CARD = Template(
+    '<div class="book-card">'
+    '<div class="book-cover-container">'
+    '<img src="$cover" class="book-cover" alt="$title" loading="lazy" '
+    'onerror="this.onerror=null;this.src=\'$placeholder\'">'
+    '</div>'
+    '<div class="book-details">'
+    '<h3 class="book-title">$title</h3>'
+    '<div class="book-author">$author</div>'
+    '<div class="book-meta">'
+    '<span class="meta-item">$release_date</span>'
+    '<span class="meta-item">$genre</span>'
+    '</div>'
+    '<p class="book-description">$description</p>'
+    '<div class="card-actions">'
+    '<a href="$preview_link" target="_blank" rel="noopener" class="preview-btn">'
+    '<span>Quantum Preview</span> ⚡'
+    '</a>'
+    '<a href="?like=$like" target="_self" class="like-btn" title="More like this">🧬</a>'
+    '</div>'
+    '</div>'
+    '</div>'
+)
+
+_GENRE_REC = Template(
+    '<div class="rec-card">'
+    '<h4 class="rec-title">📡 Genre Frequency Detected</h4>'
+    '<p class="rec-content">Our quantum algorithms suggest you\'ll resonate with <strong>$genre</strong> literature. '
+    'This dimensional frequency aligns with your search parameters.</p>'
+    '</div>'
+)
+
+_AUTHOR_REC = Template(
+    '<div class="rec-card">'
+    '<h4 class="rec-title">🔍 Author Signature Match</h4>'
+    '<p class="rec-content">The creative waveform of <strong>$author</strong> matches your search harmonics. '
+    'Explore their literary dimension.</p>'
+    '</div>'
+)
+
+
+_WATERFALL_ROW = Template(
+    '<div class="waterfall-row" title="$attrs">'
+    '<span class="waterfall-name">$name</span>'
+    '<div class="waterfall-track"><div class="waterfall-bar" style="left:$left%;width:$width%"></div></div>'
+    '<span class="waterfall-ms">$ms ms</span>'
+    '</div>'
+)
+
+
+def truncate(text, limit=DESCRIPTION_LIMIT):
+    if len(text) <= limit:
+        return text
+    cut = text[:limit].rsplit(" ", 1)[0].rstrip(",.;:- ")
+    return cut + "…"
+
+
+def safe_url(url, default="#"):
+    # Only http(s) links make it into href/src; anything else (javascript:, data:) is dropped
+    if not url or not url.lower().startswith(("https://", "http://")):
+        return default
+    return html.escape(url, quote=True)
+
+
+def text(value):
+    # Newlines are collapsed too: a blank line would end the HTML block mid-card
+    return html.escape(" ".join(str(value).split()))
+
+
+def age(seconds):
+    # Coarse "how old" for cached results: 5 min, 3 h, 2 days
+    minutes = max(1, int(seconds // 60))
+    if minutes < 60:
+        return f"{minutes} min"
+    if minutes < 48 * 60:
+        return f"{minutes // 60} h"
+    return f"{minutes // (24 * 60)} days"
+
+
+def render_card(book):
+    placeholder = html.escape(placeholder_url(), quote=True)
+    cover = cover_url(book)
+    return _CARD.substitute(
+        cover=placeholder if cover.startswith("data:") else safe_url(cover, placeholder),
+        placeholder=placeholder,
+        title=text(book.title),
+        author=text(book.author),
+        release_date=text(book.release_date),
+        genre=text(book.genre),
+        description=text(truncate(book.description)),
+        preview_link=safe_url(book.preview_link),
+        like=quote(volume_key(book), safe=""),
+    )
+
+
+def render_grid(books):
+    # The whole grid goes out as one element instead of one delta per card
+    return '<div class="book-grid">' + "".join(render_card(book) for book in books) + "</div>"
+
+
+def render_recommendations(genre, author):
+    parts = ['<div class="ai-recs"><h3 class="ai-title">Neural Network Recommendations</h3>']
+    if genre:
+        parts.append(_GENRE_REC.substitute(genre=text(genre)))
+    if author:
+        parts.append(_AUTHOR_REC.substitute(author=text(author)))
+    parts.append("</div>")
+    return "".join(parts)
+
+
+def render_waterfall(trace):
+    # One row per span, offset and sized relative to the whole rerun
+    total = max(trace.duration_ms, 1e-3)
+    rows = []
+    for span in trace.spans:
+        attrs = " ".join(f"{key}={value}" for key, value in span["attrs"].items())
+        rows.append(_WATERFALL_ROW.substitute(
+            name=text(span["name"] + (f" ({attrs})" if attrs else "")),
+            attrs=text(attrs),
+            left=f"{span['start_ms'] / total * 100:.2f}",
+            width=f"{span['duration_ms'] / total * 100:.2f}",
+            ms=f"{span['duration_ms']:.1f}",
+        ))
+    rows.append(_WATERFALL_ROW.substitute(
+        name=text(trace.name), attrs="", left="0", width="100", ms=f"{trace.duration_ms:.1f}",
+    ))
+    return '<div class="waterfall">' + "".join(rows) + "</div>"
@@ -0,0 +1,23 @@
+import threading
+
+
+class Resource:
+    # A process-wide object built on first use. Streamlit only re-executes
+    # main.py on a rerun, so whatever is held here is shared by every rerun
+    # and every session, and nothing is built until something needs it.
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._value = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self._value is not None
+
+    def get(self):
+        if self._value is None:
+            with self._lock:
+                if self._value is None:
+                    self._value = self._factory()
+        return self._value
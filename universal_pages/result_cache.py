@@ -0,0 +1,119 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def normalize_query(query):
+    return " ".join(query.lower().split())
+
+
+class TwoTierCache:
+    # Bounded in-process LRU in front of a persistent SQLite store. Both tiers
+    # share the same TTL; an entry promoted from disk keeps its original expiry.
+    # Expired entries are kept for another `stale_ttl` seconds so lookup() can
+    # still serve them while they are refreshed or while the upstream is down.
+    # Values are stored as JSON; `decode` rebuilds richer objects on the way back.
+
+    def __init__(self, path, ttl, max_memory_entries=256, max_disk_entries=10000, decode=None, stale_ttl=0):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.decode = decode
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "stale_hits": 0, "misses": 0, "evictions": 0}
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS cache_accessed ON cache(accessed_at)")
+        self._db.commit()
+
+    def get(self, key):
+        entry = self.lookup(key)
+        return None if entry is None else entry[0]
+
+    def lookup(self, key, stale=False):
+        # (value, expires_at), or None; with stale=True an entry past its TTL
+        # but within stale_ttl of it is returned too
+        now = time.time()
+        retained_after = now - self.stale_ttl
+        usable_after = retained_after if stale else now
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > usable_after:
+                    self._memory.move_to_end(key)
+                    self._stats["memory_hits" if expires_at > now else "stale_hits"] += 1
+                    return value, expires_at
+                if expires_at <= retained_after:
+                    del self._memory[key]
+
+            row = self._db.execute(
+                "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or row[1] <= usable_after:
+                self._stats["misses"] += 1
+                return None
+
+            self._db.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            value = json.loads(row[0])
+            if self.decode is not None:
+                value = self.decode(value)
+            self._remember(key, value, row[1])
+            self._stats["disk_hits" if row[1] > now else "stale_hits"] += 1
+            return value, row[1]
+
+    def set(self, key, value):
+        now = time.time()
+        expires_at = now + self.ttl
+        with self._lock:
+            self._remember(key, value, expires_at)
+            self._db.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), expires_at, now),
+            )
+            self._evict_disk(now)
+            self._db.commit()
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._db.execute("DELETE FROM cache")
+            self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+            stats["disk_entries"] = self._db.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        return stats
+
+    def _remember(self, key, value, expires_at):
+        self._memory[key] = (value, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def _evict_disk(self, now):
+        self._db.execute("DELETE FROM cache WHERE expires_at <= ?", (now - self.stale_ttl,))
+        overflow = self._db.execute("SELECT COUNT(*) FROM cache").fetchone()[0] - self.max_disk_entries
+        if overflow > 0:
+            self._db.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed_at LIMIT ?)",
+                (overflow,),
+            )
+            self._stats["evictions"] += overflow
@@ -0,0 +1,76 @@
+import threading
+from collections import deque
+
+
+class ModelStats:
+    # Request, token and parse-failure counts for one model, plus a window of
+    # recent latencies for routing decisions
+
+    def __init__(self, window=100):
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._stats = {
+            "requests": 0, "errors": 0, "prompts": 0, "parse_failures": 0,
+            "escalations": 0, "prompt_tokens": 0, "completion_tokens": 0,
+        }
+
+    def record(self, latency, prompts, parse_failures, prompt_tokens=0, completion_tokens=0):
+        with self._lock:
+            self._latencies.append(latency)
+            self._stats["requests"] += 1
+            self._stats["prompts"] += prompts
+            self._stats["parse_failures"] += parse_failures
+            self._stats["prompt_tokens"] += prompt_tokens
+            self._stats["completion_tokens"] += completion_tokens
+
+    def record_error(self):
+        with self._lock:
+            self._stats["errors"] += 1
+
+    def record_escalations(self, count):
+        with self._lock:
+            self._stats["escalations"] += count
+
+    def percentile(self, pct):
+        with self._lock:
+            ordered = sorted(self._latencies)
+        if not ordered:
+            return None
+        return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+
+    def stats(self):
+        p50, p95 = self.percentile(50), self.percentile(95)
+        with self._lock:
+            stats = dict(self._stats)
+        stats["parse_failure_rate"] = round(stats["parse_failures"] / stats["prompts"], 4) if stats["prompts"] else 0.0
+        stats["p50_ms"] = round(p50 * 1000, 1) if p50 is not None else 0.0
+        stats["p95_ms"] = round(p95 * 1000, 1) if p95 is not None else 0.0
+        return stats
+
+
+class ModelRouter:
+    # Short prompts go to the small model; longer ones go to the large model
+    # unless it has recently been too slow to fit the latency budget and the
+    # small one hasn't. Intents the small model can't produce are retried on
+    # the large model (see escalation()).
+
+    def __init__(self, fast_model, large_model, fast_max_words=12, budget=2.0):
+        self.fast_model = fast_model
+        self.large_model = large_model
+        self.fast_max_words = fast_max_words
+        self.budget = budget
+        self.models = {model: ModelStats() for model in dict.fromkeys((fast_model, large_model)) if model}
+
+    def route(self, prompt):
+        if not self.fast_model:
+            return self.large_model
+        if len(prompt.split()) <= self.fast_max_words:
+            return self.fast_model
+        large_p50 = self.models[self.large_model].percentile(50)
+        fast_p50 = self.models[self.fast_model].percentile(50)
+        if large_p50 is not None and large_p50 > self.budget and (fast_p50 is None or fast_p50 <= self.budget):
+            return self.fast_model
+        return self.large_model
+
+    def escalation(self, model):
+        return self.large_model if model != self.large_model else None
@@ -0,0 +1,128 @@
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+from . import metrics
+from .config import SEARCH_TIMEOUT, LLM_BUDGET, QUERY_FANOUT
+from .planner import RAW_WEIGHT, merge_ranked, plan_queries
+from .ratelimit import UpstreamUnavailable
+
+EMPTY_INTENT = {"genre": "", "author": "", "length": ""}
+
+# Shared across Streamlit reruns and sessions since the module is only imported once.
+# Separate pools so book fetches never queue behind slow (or budget-overrunning) LLM calls.
+_intent_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="search-intent")
+_books_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="search-books")
+
+
+def _result_or(future, default, propagate=()):
+    exc = future.exception()
+    if exc is not None:
+        if isinstance(exc, propagate):
+            raise exc
+        return default
+    return future.result()
+
+
+def stream_search(query: str, ask, fetch, timeout: float = SEARCH_TIMEOUT,
+                  intent_budget: float = LLM_BUDGET, executor=None, fanout: bool = QUERY_FANOUT):
+    # The intent extraction and the book fetch are independent, so start both
+    # at once and yield ("books", books), ("intent_partial", intent) and
+    # ("intent", intent) events in the order they land, so the caller can draw
+    # cards before the LLM has answered. Books get the whole deadline; the
+    # intent only gets its slice of it, and if it misses that the best partial
+    # intent goes out while the call finishes in the background (Agent.ask
+    # memoizes it for next time). "books" and "intent" are always yielded.
+    #
+    # With fanout, the intent (or the partial one at the end of its slice) is
+    # turned into targeted sub-queries that run in parallel; once they are in,
+    # a second "books" event carries the merged, re-ranked list.
+    events = queue.Queue()
+    books_executor = executor or _books_executor
+    with metrics.span("search") as span:
+        started = time.perf_counter()
+        intent_future = (executor or _intent_executor).submit(
+            metrics.bind(ask), query, on_partial=lambda intent: events.put(("intent_partial", intent)),
+        )
+        books_future = books_executor.submit(metrics.bind(fetch), query)
+        intent_future.add_done_callback(lambda future: events.put(("intent", future)))
+        books_future.add_done_callback(lambda future: events.put(("books", future)))
+
+        books_deadline = started + timeout
+        intent_deadline = started + min(intent_budget, timeout)
+        intent = dict(EMPTY_INTENT)
+        books = []
+        pending = {"books", "intent"}
+        planned = not fanout
+        sub_plan, sub_results = [], []
+
+        def plan(intent):
+            for sub_query, weight in plan_queries(query, intent)[1:]:
+                future = books_executor.submit(metrics.bind(fetch), sub_query)
+                future.add_done_callback(lambda future, weight=weight: events.put(("sub", (weight, future))))
+                sub_plan.append(sub_query)
+            span["sub_queries"] = len(sub_plan)
+
+        while True:
+            now = time.perf_counter()
+            if not planned and now >= intent_deadline:
+                # The LLM is over its slice: plan with the best partial intent
+                planned = True
+                plan(intent)
+            books_open = "books" in pending or len(sub_results) < len(sub_plan)
+            # An intent is used as long as the books are still coming or its slice hasn't run out
+            intent_open = "intent" in pending and (books_open or now < intent_deadline)
+            if not (books_open or intent_open):
+                break
+            deadline = books_deadline if books_open else intent_deadline
+            if not planned:
+                deadline = min(deadline, intent_deadline)
+            try:
+                kind, value = events.get(timeout=max(0.0, deadline - now))
+            except queue.Empty:
+                if time.perf_counter() >= books_deadline:
+                    break
+                continue
+
+            if kind == "intent_partial":
+                if "intent" in pending:
+                    intent = dict(EMPTY_INTENT, **value)
+                    yield kind, dict(intent)
+            elif kind == "intent":
+                if "intent" in pending:
+                    pending.discard(kind)
+                    intent = _result_or(value, intent)
+                    yield kind, dict(intent)
+                    if not planned:
+                        planned = True
+                        plan(intent)
+            elif kind == "books":
+                pending.discard(kind)
+                # Being throttled or cut off is reported to the caller rather than shown as "no books"
+                books = _result_or(value, [], propagate=(UpstreamUnavailable,))
+                metrics.record("search.first_result", started, time.perf_counter() - started, books=len(books))
+                yield kind, books
+            else:
+                weight, future = value
+                # A failed or throttled sub-query only loses its contribution
+                sub_results.append((weight, _result_or(future, [])))
+
+        span["intent_late"] = "intent" in pending
+        if "books" in pending:
+            yield "books", []
+        if "intent" in pending:
+            yield "intent", dict(intent)
+        if any(ranked for _, ranked in sub_results):
+            ranked_lists = [(RAW_WEIGHT, books)] + sub_results
+            limit = max(len(ranked) for _, ranked in ranked_lists)
+            merged = merge_ranked(ranked_lists, intent, limit, query)
+            if merged != books:
+                yield "books", merged
+
+
+def run_search(query: str, ask, fetch, timeout: float = SEARCH_TIMEOUT,
+               intent_budget: float = LLM_BUDGET, executor=None, fanout: bool = QUERY_FANOUT):
+    # Blocking form of stream_search: returns (intent, books)
+    results = {}
+    for kind, value in stream_search(query, ask, fetch, timeout, intent_budget, executor, fanout):
+        results[kind] = value
+    return results["intent"], results["books"]
@@ -0,0 +1,43 @@
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    # Collapses concurrent calls that share a key into one: the first caller
+    # runs the function and everyone who arrives while it is in flight waits
+    # for, and receives, the same result (or exception).
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "coalesced": 0}
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self._stats["coalesced"] += 1
+                leader = False
+            else:
+                future = Future()
+                self._calls[key] = future
+                self._stats["calls"] += 1
+                leader = True
+
+        if not leader:
+            return future.result()
+
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as exc:
+            future.set_exception(exc)
+        finally:
+            with self._lock:
+                del self._calls[key]
+        return future.result()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["in_flight"] = len(self._calls)
+        return stats
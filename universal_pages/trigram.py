@@ -0,0 +1,130 @@
+import threading
+from .intent_cache import normalize_prompt
+
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramIndex:
+    # Typo-tolerant lookup over short strings (titles, author names). Each
+    # trigram maps to a NumPy array of entry ids; a query counts shared
+    # trigrams across its postings to pick candidates, and only the top-k of
+    # those are re-scored with fuzzywuzzy. Matching is whole-string: it
+    # corrects "harry poter", it doesn't find titles that contain the query.
+    # Discarded entries are skipped until they outnumber the live ones, then
+    # the index is rebuilt.
+
+    def __init__(self, candidates=16, min_overlap=0.5):
+        self.candidates = candidates
+        self.min_overlap = min_overlap
+        self._texts = []
+        self._payloads = []
+        self._ids = {}
+        self._sizes = []
+        self._postings = {}
+        self._arrays = {}
+        self._size_array = None
+        self._discarded = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._ids)
+
+    def add(self, text, payload):
+        key = normalize_prompt(text)
+        if not key:
+            return
+        with self._lock:
+            self._insert(key, [payload])
+
+    def discard(self, text):
+        key = normalize_prompt(text)
+        with self._lock:
+            entry = self._ids.pop(key, None)
+            if entry is None:
+                return
+            self._texts[entry] = None
+            self._payloads[entry] = None
+            self._discarded += 1
+            if self._discarded > len(self._ids):
+                self._rebuild()
+
+    def shortlist(self, query):
+        # [(text, payloads)] for the entries sharing the most trigrams with
+        # the query, unscored; callers re-score them with their own scorer
+        import numpy as np
+
+        key = normalize_prompt(query)
+        if len(key) < 4:
+            return []
+        grams = trigrams(key)
+        with self._lock:
+            arrays = [self._compiled(gram) for gram in grams if gram in self._postings]
+            if not arrays:
+                return []
+            if self._size_array is None or len(self._size_array) != len(self._sizes):
+                self._size_array = np.asarray(self._sizes, dtype=np.int32)
+            entries, shared = np.unique(np.concatenate(arrays), return_counts=True)
+            # Entries sharing too few trigrams can't reach the cutoff; drop them
+            # before the (pure Python) fuzzy re-scoring
+            keep = shared >= self.min_overlap * len(grams)
+            entries, shared = entries[keep], shared[keep]
+            dice = 2.0 * shared / (len(grams) + self._size_array[entries])
+            if len(entries) > self.candidates:
+                top = np.argpartition(-dice, self.candidates)[:self.candidates]
+                entries = entries[top]
+            return [
+                (self._texts[entry], list(self._payloads[entry]))
+                for entry in entries if self._texts[entry] is not None
+            ]
+
+    def search(self, query, limit=5, cutoff=85):
+        # Returns [(text, score, payloads)] best first, scores on fuzzywuzzy's 0-100 scale
+        from fuzzywuzzy import fuzz
+
+        key = normalize_prompt(query)
+        results = []
+        for text, entry_payloads in self.shortlist(key):
+            # A typo changes the length by a character or two, not by a subtitle
+            if abs(len(text) - len(key)) > max(2, len(key) // 5):
+                continue
+            score = fuzz.ratio(key, text)
+            if score >= cutoff:
+                results.append((text, score, entry_payloads))
+        results.sort(key=lambda result: (-result[1], abs(len(result[0]) - len(key))))
+        return results[:limit]
+
+    def _insert(self, key, payloads):
+        entry = self._ids.get(key)
+        if entry is not None:
+            self._payloads[entry].extend(payloads)
+            return
+        entry = len(self._texts)
+        self._ids[key] = entry
+        self._texts.append(key)
+        self._payloads.append(payloads)
+        grams = trigrams(key)
+        self._sizes.append(len(grams))
+        for gram in grams:
+            self._postings.setdefault(gram, []).append(entry)
+            # Invalidate the compiled array; it is rebuilt on the next query
+            self._arrays.pop(gram, None)
+
+    def _rebuild(self):
+        live = [(text, payloads) for text, payloads in zip(self._texts, self._payloads) if text is not None]
+        self._texts, self._payloads, self._ids, self._sizes = [], [], {}, []
+        self._postings, self._arrays, self._size_array = {}, {}, None
+        self._discarded = 0
+        for text, payloads in live:
+            self._insert(text, payloads)
+
+    def _compiled(self, gram):
+        import numpy as np
+
+        array = self._arrays.get(gram)
+        if array is None:
+            array = np.asarray(self._postings[gram], dtype=np.int32)
+            self._arrays[gram] = array
+        return array
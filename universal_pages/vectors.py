@@ -0,0 +1,235 @@
+import json
+import math
+import os
+import threading
+
+# Arrays of the CSR matrix, each saved as <name>.npy next to meta.json
+_ARRAYS = ("indptr", "indices", "data")
+
+
+class TfidfMatrix:
+    # Sparse term-weight matrix with one row per catalog volume, stored CSR
+    # style in three NumPy arrays. Saved rows are reopened memory-mapped, so a
+    # restart doesn't re-tokenize every description; rows added since are
+    # kept in Python lists and appended to the arrays (grown geometrically,
+    # like a list) before the next query. Document frequencies are kept up to
+    # date as rows are appended; IDF is applied at query time, and only to the
+    # rows being scored.
+
+    def __init__(self, path=None, save_every=500):
+        self.path = path
+        self.save_every = save_every
+        self._terms = {}
+        self._keys = []
+        self._pending = []
+        self._unsaved = 0
+        # CSR buffers; only the first _rows + 1 / _nnz entries are in use
+        self._buffers = None
+        self._rows = 0
+        self._nnz = 0
+        self._growable = False
+        self._df = None
+        self._derived = None
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._keys)
+
+    def load(self, keys):
+        # Maps the saved matrix if its rows are a prefix of `keys` (the
+        # catalog's volume keys in row order) and returns how many rows it
+        # covers; the caller adds the rest
+        import numpy as np
+
+        if not self.path or not os.path.exists(os.path.join(self.path, "meta.json")):
+            return 0
+        try:
+            with open(os.path.join(self.path, "meta.json"), encoding="utf-8") as meta_file:
+                meta = json.load(meta_file)
+            arrays = tuple(np.load(os.path.join(self.path, f"{name}.npy"), mmap_mode="r") for name in _ARRAYS)
+        except (OSError, ValueError):
+            return 0
+        saved = meta["keys"]
+        if saved != keys[:len(saved)] or len(arrays[0]) != len(saved) + 1:
+            return 0
+        with self._lock:
+            self._terms = {term: column for column, term in enumerate(meta["terms"])}
+            self._keys = list(saved)
+            self._buffers = arrays
+            self._rows = len(saved)
+            self._nnz = len(arrays[1])
+            # Read-only maps; copied into growable buffers when rows are next appended
+            self._growable = False
+            self._df = np.bincount(arrays[1], minlength=len(self._terms)).astype(np.int64)
+            self._derived = None
+        return len(saved)
+
+    def add(self, key, weights):
+        # weights: {term: raw weight}; stored sublinearly as 1 + log(weight)
+        with self._lock:
+            columns, values = [], []
+            for term, weight in weights.items():
+                if weight <= 0:
+                    continue
+                columns.append(self._terms.setdefault(term, len(self._terms)))
+                values.append(1.0 + math.log(weight))
+            self._keys.append(key)
+            self._pending.append((columns, values))
+
+    def similar(self, row, limit=5):
+        # [(row, cosine)] of the rows closest to `row`, best first, excluding itself
+        import numpy as np
+
+        with self._lock:
+            indptr, indices, _ = self._fold()
+            idf, weighted, rows, norms = self._derive()
+            start, end = indptr[row], indptr[row + 1]
+            query = np.zeros(len(idf), dtype=np.float32)
+            query[indices[start:end]] = weighted[start:end]
+            scores = self._cosine(query, indices, weighted, rows, norms)
+        scores[row] = -1.0
+        return self._top(scores, limit)
+
+    def scores(self, weights, rows):
+        # Cosine between a free-text query ({term: weight}) and each of `rows`;
+        # only those rows' entries are read
+        import numpy as np
+
+        rows = np.asarray(rows, dtype=np.int64)
+        with self._lock:
+            indptr, indices, data = self._fold()
+            query = np.zeros(len(self._terms), dtype=np.float32)
+            for term, weight in weights.items():
+                column = self._terms.get(term)
+                if column is not None and weight > 0:
+                    query[column] = (1.0 + math.log(weight)) * self._idf(np.asarray([column]))[0]
+            starts, lengths = indptr[rows], indptr[rows + 1] - indptr[rows]
+            owners = np.repeat(np.arange(len(rows)), lengths)
+            # Positions of every entry in the selected rows, row after row
+            positions = np.arange(int(lengths.sum())) + np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+            columns = indices[positions]
+            weighted = data[positions] * self._idf(columns)
+        query_norm = float(np.sqrt(np.dot(query, query)))
+        if not query_norm:
+            return np.zeros(len(rows))
+        norms = np.sqrt(np.bincount(owners, weights=weighted * weighted, minlength=len(rows)))
+        dots = np.bincount(owners, weights=weighted * query[columns], minlength=len(rows))
+        return dots / np.maximum(norms * query_norm, 1e-12)
+
+    def save(self):
+        import numpy as np
+
+        if not self.path:
+            return
+        with self._lock:
+            arrays = self._fold()
+            os.makedirs(self.path, exist_ok=True)
+            for name, array in zip(_ARRAYS, arrays):
+                # Write then rename so a reader never maps a half-written file
+                tmp = os.path.join(self.path, f"{name}.tmp.npy")
+                np.save(tmp, np.ascontiguousarray(array))
+                os.replace(tmp, os.path.join(self.path, f"{name}.npy"))
+            terms = sorted(self._terms, key=self._terms.get)
+            tmp = os.path.join(self.path, "meta.json.tmp")
+            with open(tmp, "w", encoding="utf-8") as meta_file:
+                json.dump({"terms": terms, "keys": self._keys}, meta_file)
+            os.replace(tmp, os.path.join(self.path, "meta.json"))
+            self._unsaved = 0
+
+    def _fold(self):
+        # Appends pending rows to the CSR buffers and returns views of the rows
+        # in use; called with the lock held
+        import numpy as np
+
+        if self._buffers is None:
+            self._buffers = (np.zeros(1, dtype=np.int64), np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32))
+            self._growable = True
+            self._df = np.zeros(0, dtype=np.int64)
+        if self._pending:
+            lengths = np.fromiter((len(columns) for columns, _ in self._pending), dtype=np.int64, count=len(self._pending))
+            count = int(lengths.sum())
+            new_indices = np.fromiter(
+                (column for columns, _ in self._pending for column in columns), dtype=np.int32, count=count,
+            )
+            new_data = np.fromiter(
+                (value for _, values in self._pending for value in values), dtype=np.float32, count=count,
+            )
+            rows, nnz = self._rows + len(lengths), self._nnz + count
+            self._reserve(rows, nnz)
+            indptr, indices, data = self._buffers
+            indptr[self._rows + 1:rows + 1] = indptr[self._rows] + np.cumsum(lengths)
+            indices[self._nnz:nnz] = new_indices
+            data[self._nnz:nnz] = new_data
+            if len(self._df) < len(self._terms):
+                df = np.zeros(max(len(self._terms), 2 * len(self._df)), dtype=np.int64)
+                df[:len(self._df)] = self._df
+                self._df = df
+            self._df[:len(self._terms)] += np.bincount(new_indices, minlength=len(self._terms))
+            self._rows, self._nnz = rows, nnz
+            self._unsaved += len(self._pending)
+            self._pending = []
+            self._derived = None
+            if self.path and self._unsaved >= self.save_every:
+                self.save()
+        indptr, indices, data = self._buffers
+        return indptr[:self._rows + 1], indices[:self._nnz], data[:self._nnz]
+
+    def _reserve(self, rows, nnz):
+        # Grows the buffers to hold `rows` rows and `nnz` entries, doubling so
+        # appends are amortized O(new entries); maps are copied on first growth
+        import numpy as np
+
+        indptr, indices, data = self._buffers
+        if self._growable and len(indptr) > rows and len(indices) >= nnz:
+            return
+        row_capacity = max(rows + 1, 2 * len(indptr)) if len(indptr) <= rows else len(indptr)
+        capacity = max(nnz, 2 * len(indices)) if len(indices) < nnz else len(indices)
+        grown = (
+            np.zeros(row_capacity, dtype=np.int64), np.zeros(capacity, dtype=np.int32),
+            np.zeros(capacity, dtype=np.float32),
+        )
+        grown[0][:self._rows + 1] = indptr[:self._rows + 1]
+        grown[1][:self._nnz] = indices[:self._nnz]
+        grown[2][:self._nnz] = data[:self._nnz]
+        self._buffers = grown
+        self._growable = True
+
+    def _idf(self, columns):
+        import numpy as np
+
+        return (np.log((1.0 + self._rows) / (1.0 + self._df[columns])) + 1.0).astype(np.float32)
+
+    def _derive(self):
+        # (idf, tf-idf values, row of each value, row norms) over every row, for
+        # "more like this"; cached until rows change
+        import numpy as np
+
+        if self._derived is None:
+            indptr, indices, data = self._fold()
+            idf = self._idf(np.arange(len(self._terms)))
+            weighted = data * idf[indices]
+            rows = np.repeat(np.arange(self._rows), np.diff(indptr))
+            norms = np.sqrt(np.bincount(rows, weights=weighted * weighted, minlength=self._rows))
+            self._derived = (idf, weighted, rows, norms)
+        return self._derived
+
+    @staticmethod
+    def _cosine(query, indices, weighted, rows, norms):
+        import numpy as np
+
+        query_norm = float(np.sqrt(np.dot(query, query)))
+        if not query_norm:
+            return np.zeros(len(norms))
+        dots = np.bincount(rows, weights=weighted * query[indices], minlength=len(norms))
+        return dots / np.maximum(norms * query_norm, 1e-12)
+
+    @staticmethod
+    def _top(scores, limit):
+        import numpy as np
+
+        if len(scores) > limit:
+            top = np.argpartition(-scores, limit)[:limit]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(row), float(scores[row])) for row in top if scores[row] > 0]